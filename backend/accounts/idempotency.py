@@ -0,0 +1,118 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .models import IdempotencyKey
+
+# A claim left unfinished this long belongs to a request that died; it can be taken over
+IN_PROGRESS_TIMEOUT = timedelta(minutes=5)
+
+
+def request_fingerprint(request):
+    """Hash of who sent the request and what it contained."""
+    user_id = request.user.pk if request.user.is_authenticated else None
+    body = json.dumps(request.data, sort_keys=True, cls=JSONEncoder, default=str)
+    return hashlib.sha256(f"{user_id}:{body}".encode()).hexdigest()
+
+
+def claim_key(scope, key, fingerprint):
+    """
+    Reserve (scope, key) for this request. Returns (record, None) when the
+    request should run, or (None, response) to answer it with instead: the
+    stored response for a retry, or an error.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                scope=scope, key=key, request_hash=fingerprint, expires_at=expires_at
+            )
+        return record, None
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record is None or record.expires_at <= now or (
+        record.status_code is None and record.created_at <= now - IN_PROGRESS_TIMEOUT
+    ):
+        # Expired or abandoned: take it over, unless another retry just did
+        taken = record and IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).update(
+            request_hash=fingerprint, status_code=None, response_body=None,
+            created_at=now, expires_at=expires_at,
+        )
+        if taken:
+            record.refresh_from_db()
+            return record, None
+        return None, Response(
+            {"detail": "A request with this Idempotency-Key is already in progress."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    if record.request_hash != fingerprint:
+        return None, Response(
+            {"detail": "This Idempotency-Key was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        return None, Response(
+            {"detail": "A request with this Idempotency-Key is already in progress."},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return None, Response(record.response_body, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent_response(request, scope, handler):
+    """
+    Run `handler` once per Idempotency-Key and replay its response to retries.
+
+    The handler and the stored response commit together, so a retry sees
+    either nothing (and runs) or the finished response. Exceptions and
+    server errors release the key so the client can try again.
+    """
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        return handler()
+    if len(key) > 255:
+        return Response(
+            {"detail": "Idempotency-Key must be at most 255 characters."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    record, response = claim_key(scope, key, request_fingerprint(request))
+    if response is not None:
+        return response
+
+    try:
+        with transaction.atomic():
+            response = handler()
+            if response.status_code < 500:
+                record.status_code = response.status_code
+                record.response_body = json.loads(json.dumps(response.data, cls=JSONEncoder))
+                record.save(update_fields=["status_code", "response_body"])
+    except Exception:
+        record.delete()
+        raise
+    if response.status_code >= 500:
+        record.delete()
+    return response
+
+
+class IdempotentPostMixin:
+    """
+    APIView mixin honouring an Idempotency-Key header on POST: a repeated
+    request gets the original response instead of running the create again.
+    """
+    idempotency_scope = None
+
+    def post(self, request, *args, **kwargs):
+        return idempotent_response(
+            request,
+            self.idempotency_scope or self.__class__.__name__,
+            lambda: super(IdempotentPostMixin, self).post(request, *args, **kwargs),
+        )
@@ -0,0 +1,98 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounts.utils import referenced_media_names
+
+
+def walk_files(path):
+    """Yield every regular file below `path` as an os.DirEntry, streaming with scandir."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+class Command(BaseCommand):
+    help = "Remove media files that are no longer referenced by any FileField/ImageField."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir", action="append", dest="dirs", default=None,
+            help="Top-level media directory to scan (repeatable). Defaults to settings.MEDIA_GC_DIRS.",
+        )
+        parser.add_argument(
+            "--min-age-hours", type=float, default=24,
+            help="Only consider files older than this, so in-flight uploads are never touched.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report orphaned files without deleting them.",
+        )
+
+    def handle(self, *args, **options):
+        media_root = os.path.abspath(settings.MEDIA_ROOT)
+        # Only directories whose files belong to model rows; others may hold row-less files in use
+        roots = [os.path.join(media_root, d) for d in options["dirs"] or settings.MEDIA_GC_DIRS]
+        cutoff = time.time() - options["min_age_hours"] * 3600
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        scanned = orphaned = reclaimed = 0
+        for root in roots:
+            if not os.path.isdir(root):
+                if not options["dirs"]:
+                    # A default directory nothing has been uploaded to yet
+                    continue
+                self.stdout.write(self.style.WARNING(f"No {os.path.relpath(root, media_root)} directory found."))
+                continue
+
+            batch = {}
+            for entry in walk_files(root):
+                scanned += 1
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > cutoff:
+                    continue
+                name = os.path.relpath(entry.path, media_root).replace(os.sep, "/")
+                batch[name] = (entry.path, stat.st_size)
+                if len(batch) >= batch_size:
+                    count, size = self.sweep(batch, batch_size, dry_run)
+                    orphaned += count
+                    reclaimed += size
+                    batch = {}
+
+            count, size = self.sweep(batch, batch_size, dry_run)
+            orphaned += count
+            reclaimed += size
+
+        verb = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Cleanup complete. Scanned {scanned} files. {verb} {orphaned} unused files, "
+                f"reclaiming {reclaimed} bytes."
+            )
+        )
+
+    def sweep(self, batch, batch_size, dry_run):
+        """Delete the files in `batch` that no model row references."""
+        if not batch:
+            return 0, 0
+
+        referenced = referenced_media_names(list(batch), chunk_size=batch_size)
+
+        count = size = 0
+        for name, (path, file_size) in batch.items():
+            if name in referenced:
+                continue
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            count += 1
+            size += file_size
+            self.stdout.write(f"{'Unused' if dry_run else 'Deleted unused'} file: {name}")
+        return count, size
@@ -35,3 +35,28 @@ class User(AbstractUser):
 
     
 
+
+
+class IdempotencyKey(models.Model):
+    """
+    The stored response of a POST sent with an Idempotency-Key header, so a
+    retry of the same request is answered without running it again. Rows
+    expire after IDEMPOTENCY_KEY_TTL_HOURS and are removed by
+    purge_idempotency_keys.
+    """
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    # Empty while the first request is still running
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="unique_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
@@ -5,10 +5,64 @@ def start():
     scheduler = BackgroundScheduler()
     # Run every Sunday at 2 AM
     scheduler.add_job(
-        lambda: call_command('cleanup_profile_pictures'),
+        lambda: call_command('cleanup_orphan_media'),
         'cron',
         day_of_week='sun',
         hour=2,
         minute=0
     )
+    # Correct storage accounting drift every night at 3 AM
+    scheduler.add_job(
+        lambda: call_command('reconcile_storage'),
+        'cron',
+        hour=3,
+        minute=0
+    )
+    # Remove files of deleted photos every 5 minutes
+    scheduler.add_job(
+        lambda: call_command('process_file_deletions'),
+        'interval',
+        minutes=5
+    )
+    # Encode WebP/AVIF renditions for newly uploaded photos
+    scheduler.add_job(
+        lambda: call_command('generate_renditions'),
+        'interval',
+        minutes=2,
+        max_instances=1
+    )
+    # Shorten photo order keys grown long by drag-and-drop reordering
+    scheduler.add_job(
+        lambda: call_command('rebalance_photo_order'),
+        'interval',
+        hours=1,
+        max_instances=1
+    )
+    # Permanently delete galleries and photos whose trash retention ran out
+    scheduler.add_job(
+        lambda: call_command('purge_trash'),
+        'cron',
+        hour=4,
+        minute=0
+    )
+    # Correct dashboard rollups for the past week after bulk changes
+    scheduler.add_job(
+        lambda: call_command('rebuild_booking_rollups'),
+        'cron',
+        hour=4,
+        minute=30
+    )
+    # Email booking reminders as sessions enter their reminder windows
+    scheduler.add_job(
+        lambda: call_command('send_booking_reminders'),
+        'interval',
+        minutes=5,
+        max_instances=1
+    )
+    # Drop stored Idempotency-Key responses past their expiry
+    scheduler.add_job(
+        lambda: call_command('purge_idempotency_keys'),
+        'interval',
+        hours=1
+    )
     scheduler.start()
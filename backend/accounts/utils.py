@@ -5,6 +5,8 @@ from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.core.mail import send_mail
 from django.urls import reverse
 # accounts/utils.py
+from django.apps import apps
+from django.db import models
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
@@ -33,3 +35,26 @@ def send_activation_email(user, request):
 
     send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
 
+
+def media_file_fields():
+    """All (model, field) pairs that store paths under MEDIA_ROOT."""
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+
+def referenced_media_names(names, chunk_size=500):
+    """Return the subset of storage `names` still referenced by any FileField, using chunked IN queries."""
+    referenced = set()
+    for model, field in media_file_fields():
+        # The base manager also sees rows hidden by custom default managers
+        manager = model._base_manager
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            referenced.update(
+                manager.filter(**{f"{field.name}__in": chunk}).values_list(field.name, flat=True)
+            )
+    return referenced
@@ -1,10 +1,13 @@
 # ai_tools/utils.py
 from rembg import remove
-from PIL import Image
+from gallery.utils import load_image
 import io
 
+# Largest input handed to rembg; the cutout comes back at this size at most
+BACKGROUND_REMOVAL_MAX_SIZE = (2048, 2048)
+
 def remove_background(input_file):
-    input_image = Image.open(input_file)
+    input_image, _ = load_image(input_file, BACKGROUND_REMOVAL_MAX_SIZE)
     output = remove(input_image)
     output_io = io.BytesIO()
     output.save(output_io, format="PNG")
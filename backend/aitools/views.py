@@ -4,12 +4,13 @@ from rest_framework.response import Response
 from rest_framework import status
 from .serializers import BackgroundRemovalSerializer
 from rembg import remove, new_session
-from PIL import Image
 import io
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.conf import settings
 from subscription.models import UserSubscription  # ✅ fixed app name
+from gallery.utils import load_image, ImageTooLarge
+from .utils import BACKGROUND_REMOVAL_MAX_SIZE
 
 # Load ONNX model once at startup
 MODEL_PATH = r"C:/Users/Shina/Downloads/u2net.onnx"
@@ -48,7 +49,7 @@ class BackgroundRemovalView(APIView):
         input_image = serializer.validated_data['image']
 
         try:
-            img = Image.open(input_image)
+            img, _ = load_image(input_image, BACKGROUND_REMOVAL_MAX_SIZE)
             result = remove(img, session=session)
 
             output_io = io.BytesIO()
@@ -58,11 +59,23 @@ class BackgroundRemovalView(APIView):
             filename = f"bg_removed/output_{input_image.name}.png"
             file_path = default_storage.save(filename, output_file)
 
-            file_url = request.build_absolute_uri(settings.MEDIA_URL + filename)
+            file_url = request.build_absolute_uri(settings.MEDIA_URL + file_path)
+
+            # Cutout PNGs are large; a WebP copy keeps the alpha at a fraction of the size
+            webp_io = io.BytesIO()
+            result.save(webp_io, format="WEBP", quality=85, method=4)
+            webp_path = default_storage.save(f"{file_path}.webp", ContentFile(webp_io.getvalue()))
+            webp_url = request.build_absolute_uri(settings.MEDIA_URL + webp_path)
 
             subscription.use_spark()
 
-            return Response({"output_image": file_url}, status=status.HTTP_200_OK)
+            return Response(
+                {"output_image": file_url, "output_image_webp": webp_url},
+                status=status.HTTP_200_OK
+            )
+
+        except ImageTooLarge as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         except Exception as e:
             return Response(
@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bookings.utils import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily booking and revenue rollups behind the photographer "
+        "dashboard. Signals keep them current; this corrects drift from bulk "
+        "updates and backfills history with --since."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=7,
+            help="Rebuild this many days up to today (default: 7).",
+        )
+        parser.add_argument(
+            "--since", type=date.fromisoformat,
+            help="Rebuild every day from this date (YYYY-MM-DD) instead.",
+        )
+        parser.add_argument(
+            "--chunk-days", type=int, default=31,
+            help="Days rebuilt per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = options["since"] or today - timedelta(days=options["days"] - 1)
+        if start > today:
+            raise CommandError("Nothing to rebuild: the start date is in the future.")
+
+        rows = 0
+        chunk = timedelta(days=options["chunk_days"])
+        while start <= today:
+            end = min(start + chunk - timedelta(days=1), today)
+            rows += rebuild_rollups(start, end)
+            start = end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups: {rows} rows written."))
@@ -0,0 +1,59 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from bookings.serializers import PaymentReconcileSerializer
+from bookings.utils import read_reconciliation_file
+
+REPORT_COLUMNS = ["row", "transaction_id", "result", "payment", "booking", "booking_status", "message", "errors"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply a CSV or JSON batch of payment statuses (transaction_id, status and "
+        "optionally amount and paid_at) with bulk updates, and write a per-row report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or .json file of rows.")
+        parser.add_argument(
+            "--photographer", type=int,
+            help="Only match payments of this photographer (id).",
+        )
+        parser.add_argument("--report", help="Write the per-row report to this CSV file.")
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], "rb") as f:
+                rows = read_reconciliation_file(f, options["path"])
+        except (OSError, ValueError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        # Batches stay within the endpoint's row limit; row numbers keep counting across them
+        report = []
+        size = PaymentReconcileSerializer.MAX_ROWS
+        for offset in range(0, len(rows), size):
+            serializer = PaymentReconcileSerializer(
+                data={"rows": rows[offset:offset + size], "dry_run": options["dry_run"]}
+            )
+            if not serializer.is_valid():
+                raise CommandError(serializer.errors)
+            for entry in serializer.save(photographer_id=options["photographer"]):
+                entry["row"] += offset
+                report.append(entry)
+
+        if options["report"]:
+            with open(options["report"], "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(report)
+
+        summary = {}
+        for entry in report:
+            summary[entry["result"]] = summary.get(entry["result"], 0) + 1
+        counts = ", ".join(f"{count} {result}" for result, count in sorted(summary.items())) or "no rows"
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {len(report)} rows: {counts}{' (dry run)' if options['dry_run'] else ''}.")
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from bookings.utils import dispatch_booking_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Email photographers and clients about sessions entering a "
+        "BOOKING_REMINDER_HOURS window, skipping recipients in quiet hours until "
+        "they end. Each reminder is sent at most once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=100,
+            help="Emails sent over one SMTP connection.",
+        )
+
+    def handle(self, *args, **options):
+        counts = dispatch_booking_reminders(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {counts['sent']} reminders, deferred {counts['deferred']} for quiet hours, "
+                f"{counts['failed']} failed."
+            )
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_alter_bookingpreference_photographer'),
+        ('photographers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['photographer', 'session_date'], name='bookings_bo_photogr_4bb9f4_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:10
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_photographer_session_date_index'),
+        ('photographers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBookingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('bookings_count', models.PositiveIntegerField(default=0)),
+                ('booked_value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('photographer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_rollups', to='photographers.photographer')),
+                ('service_package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bookings.servicepackage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['photographer', 'date'], name='bookings_da_photogr_7efdaf_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('currency', models.CharField(max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('payments_count', models.PositiveIntegerField(default=0)),
+                ('photographer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='photographers.photographer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['photographer', 'date'], name='bookings_da_photogr_cc0660_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_rollups'),
+        ('photographers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['photographer', 'status', 'session_date'], name='bookings_bo_photogr_bbf474_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['client', 'session_date'], name='bookings_bo_client__44df36_idx'),
+        ),
+    ]
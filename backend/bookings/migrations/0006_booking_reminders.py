@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_list_indexes'),
+        ('photographers', '0002_photographer_calendar_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hours_before', models.PositiveIntegerField()),
+                ('claim', models.CharField(max_length=32)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['session_date', 'status'], name='bookings_bo_session_9345e9_idx'),
+        ),
+        migrations.AddField(
+            model_name='bookingreminder',
+            name='booking',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='bookings.booking'),
+        ),
+        migrations.AddField(
+            model_name='bookingreminder',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='bookingreminder',
+            constraint=models.UniqueConstraint(fields=('booking', 'user', 'hours_before'), name='unique_booking_reminder'),
+        ),
+    ]
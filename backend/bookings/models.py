@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from decimal import Decimal
 from photographers.models import Client, Photographer
@@ -34,6 +36,38 @@ class ServicePackage(models.Model):
 # ----------------------
 # 📌 Booking
 # ----------------------
+class BookingQuerySet(models.QuerySet):
+    def for_list(self):
+        """Join everything BookingSerializer reads, so a list costs one query."""
+        return self.select_related(
+            "client__user",
+            "client__photographer__user",
+            "photographer__user",
+            "service_package__photographer__user",
+        ).with_payment_totals()
+
+    def with_payment_totals(self):
+        """
+        Annotate _total_paid and _balance_due from one aggregated subquery over
+        the paid payments, instead of a payments query per booking. The
+        total_paid and balance_due properties read them; filter on the
+        underscored names.
+        """
+        amount = models.DecimalField(max_digits=12, decimal_places=2)
+        paid = (
+            Payment.objects.filter(booking=OuterRef("pk"), payment_status=Payment.STATUS_PAID)
+            .order_by()
+            .values("booking")
+            .annotate(total=Sum("amount_paid"))
+            .values("total")
+        )
+        return self.annotate(
+            _total_paid=Coalesce(Subquery(paid, output_field=amount), Value(Decimal("0.00")), output_field=amount),
+        ).annotate(
+            _balance_due=models.ExpressionWrapper(F("package_price") - F("_total_paid"), output_field=amount),
+        )
+
+
 class Booking(models.Model):
     STATUS_PENDING = "pending"
     STATUS_CONFIRMED = "confirmed"
@@ -83,8 +117,19 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BookingQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Availability and overlap checks read one photographer's date range
+            models.Index(fields=["photographer", "session_date"]),
+            # Booking lists filtered by status and date
+            models.Index(fields=["photographer", "status", "session_date"]),
+            models.Index(fields=["client", "session_date"]),
+            # The reminder dispatcher scans upcoming sessions of every photographer
+            models.Index(fields=["session_date", "status"]),
+        ]
 
     def __str__(self):
         return f"Booking #{self.id} - {self.client.get_full_name()} with {self.photographer.user.get_full_name()}"
@@ -92,12 +137,18 @@ class Booking(models.Model):
     # ---- 💡 Utility methods ----
     @property
     def total_paid(self):
-        """Sum of all successful payments for this booking"""
-        return sum(p.amount_paid for p in self.payments.filter(payment_status=Payment.STATUS_PAID))
+        """Sum of all successful payments, from with_payment_totals() when annotated"""
+        if hasattr(self, "_total_paid"):
+            return self._total_paid
+        total = self.payments.filter(payment_status=Payment.STATUS_PAID).aggregate(total=Sum("amount_paid"))["total"]
+        return total or Decimal("0.00")
 
     @property
     def balance_due(self):
-        """Remaining balance"""
+        """
+        Remaining balance. Derived from the price rather than read from the
+        _balance_due annotation so it stays right after the price is edited.
+        """
         return Decimal(self.package_price) - Decimal(self.total_paid)
 
     @property
@@ -221,3 +272,73 @@ class Payment(models.Model):
     @property
     def is_paid(self):
         return self.payment_status == self.STATUS_PAID
+
+
+# ----------------------
+# 📌 Dashboard Rollups
+# ----------------------
+class DailyBookingRollup(models.Model):
+    """
+    Bookings of a photographer per local creation date, status and package.
+    Maintained by bookings.utils.rebuild_rollups; never edited by hand.
+    """
+    photographer = models.ForeignKey(
+        Photographer, on_delete=models.CASCADE, related_name="booking_rollups"
+    )
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Booking.BOOKING_STATUS)
+    service_package = models.ForeignKey(
+        ServicePackage, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    bookings_count = models.PositiveIntegerField(default=0)
+    booked_value = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        indexes = [models.Index(fields=["photographer", "date"])]
+
+    def __str__(self):
+        return f"{self.photographer} {self.date} {self.status}: {self.bookings_count}"
+
+
+class DailyRevenueRollup(models.Model):
+    """
+    Paid payments of a photographer per local payment date and currency.
+    Maintained by bookings.utils.rebuild_rollups; never edited by hand.
+    """
+    photographer = models.ForeignKey(
+        Photographer, on_delete=models.CASCADE, related_name="revenue_rollups"
+    )
+    date = models.DateField()
+    currency = models.CharField(max_length=10)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    payments_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["photographer", "date"])]
+
+    def __str__(self):
+        return f"{self.photographer} {self.date}: {self.amount} {self.currency}"
+
+
+# ----------------------
+# 📌 Booking Reminders
+# ----------------------
+class BookingReminder(models.Model):
+    """
+    A reminder email for a booking to one recipient. The row is claimed
+    before the email is sent, so a reminder never goes out twice.
+    """
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="reminders")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    hours_before = models.PositiveIntegerField()
+    claim = models.CharField(max_length=32)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["booking", "user", "hours_before"], name="unique_booking_reminder"),
+        ]
+
+    def __str__(self):
+        return f"Reminder {self.hours_before}h before booking #{self.booking_id} to {self.user_id}"
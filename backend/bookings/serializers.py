@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import ServicePackage, Booking, BookingPreference, Payment
 from photographers.models import Photographer, Client as ClientTag
+from .utils import DEFAULT_SESSION_MINUTES, SLOT_STEP_MINUTES, find_overlap, lock_photographer, reconcile_payments
+from django.db import transaction
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 import datetime
@@ -90,6 +92,64 @@ class PaymentSerializer(serializers.ModelSerializer):
         ]
 
 
+class PaymentReconcileRowSerializer(serializers.Serializer):
+    """One line of a reconciliation batch; amount, when given, must match the payment."""
+    transaction_id = serializers.CharField(max_length=255)
+    status = serializers.ChoiceField(choices=Payment.PAYMENT_STATUS)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    paid_at = serializers.DateTimeField(required=False)
+
+
+class PaymentReconcileSerializer(serializers.Serializer):
+    """
+    A batch of payment status changes from a bank statement. Invalid rows
+    are reported and skipped; the rest are applied by reconcile_payments.
+    """
+    MAX_ROWS = 5000
+
+    rows = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_ROWS)
+    dry_run = serializers.BooleanField(default=False)
+
+    def save(self, photographer_id=None):
+        valid, report = [], []
+        for number, data in enumerate(self.validated_data['rows'], start=1):
+            row = PaymentReconcileRowSerializer(data=data)
+            if row.is_valid():
+                valid.append(dict(row.validated_data, row=number))
+            else:
+                report.append({
+                    "row": number,
+                    "transaction_id": data.get("transaction_id"),
+                    "result": "invalid",
+                    "errors": row.errors,
+                })
+
+        if valid:
+            report += reconcile_payments(valid, photographer_id, dry_run=self.validated_data['dry_run'])
+        self.report = sorted(report, key=lambda entry: entry["row"])
+        return self.report
+
+
+def ensure_slot_free(photographer, service_package, session_date, session_time, exclude_booking_id=None):
+    """
+    Raise a ValidationError if the session overlaps another booking of the
+    photographer. Call inside a transaction after lock_photographer, so a
+    parallel request cannot take the slot between this check and the insert.
+    """
+    duration = service_package.duration if service_package else None
+    overlap = find_overlap(
+        photographer.id, session_date, session_time, duration, exclude_booking_id=exclude_booking_id
+    )
+    if overlap:
+        start, end = overlap
+        raise serializers.ValidationError({
+            "session_time": (
+                f"The photographer is already booked from {start:%Y-%m-%d %H:%M} "
+                f"to {end:%Y-%m-%d %H:%M}."
+            )
+        })
+
+
 # ----------------------
 # 📌 Booking Serializer (detailed)
 # ----------------------
@@ -98,6 +158,9 @@ class BookingSerializer(serializers.ModelSerializer):
     photographer = serializers.StringRelatedField(read_only=True)
     service_package = serializers.StringRelatedField(read_only=True)
     currency_symbol = serializers.CharField(source="photographer.currency_symbol", read_only=True)
+    # Annotated by Booking.objects.with_payment_totals(); computed per row otherwise
+    total_paid = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    balance_due = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Booking
@@ -113,8 +176,61 @@ class BookingSerializer(serializers.ModelSerializer):
             "location",
             "package_price",
             "currency_symbol",
+            "total_paid",
+            "balance_due",
         ]
 
+    def update(self, instance, validated_data):
+        """Moving a session re-checks it against the photographer's other bookings."""
+        moved = any(
+            field in validated_data and validated_data[field] != getattr(instance, field)
+            for field in ('session_date', 'session_time')
+        )
+        if not moved:
+            return super().update(instance, validated_data)
+        with transaction.atomic():
+            lock_photographer(instance.photographer_id)
+            ensure_slot_free(
+                instance.photographer,
+                instance.service_package,
+                validated_data.get('session_date', instance.session_date),
+                validated_data.get('session_time', instance.session_time),
+                exclude_booking_id=instance.pk,
+            )
+            # Reminders already sent were for the old time
+            instance.reminders.all().delete()
+            return super().update(instance, validated_data)
+
+
+class BookingFilterSerializer(serializers.Serializer):
+    """Optional filters of booking lists, e.g. ?status=pending,confirmed&date_from=2025-01-01"""
+    status = serializers.CharField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate_status(self, value):
+        statuses = [status.strip() for status in value.split(",") if status.strip()]
+        unknown = set(statuses) - {choice for choice, _ in Booking.BOOKING_STATUS}
+        if unknown:
+            raise serializers.ValidationError(f"Unknown status: {', '.join(sorted(unknown))}.")
+        return statuses
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_to'] < data['date_from']:
+            raise serializers.ValidationError({"date_to": "Must not be before date_from."})
+        return data
+
+    def filter_queryset(self, queryset):
+        """Apply the validated filters to a Booking queryset."""
+        params = self.validated_data
+        if params.get('status'):
+            queryset = queryset.filter(status__in=params['status'])
+        if params.get('date_from'):
+            queryset = queryset.filter(session_date__gte=params['date_from'])
+        if params.get('date_to'):
+            queryset = queryset.filter(session_date__lte=params['date_to'])
+        return queryset
+
 
 # ----------------------
 # 📌 Booking Create Serializer
@@ -168,7 +284,16 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         # Fill package_price if missing
         if 'package_price' not in validated_data or not validated_data['package_price']:
             validated_data['package_price'] = validated_data['service_package'].price
-        return super().create(validated_data)
+
+        with transaction.atomic():
+            lock_photographer(validated_data['photographer'].id)
+            ensure_slot_free(
+                validated_data['photographer'],
+                validated_data.get('service_package'),
+                validated_data['session_date'],
+                validated_data.get('session_time'),
+            )
+            return super().create(validated_data)
 
 
 class BookingPreferenceSerializer(serializers.ModelSerializer):
@@ -178,7 +303,8 @@ class BookingPreferenceSerializer(serializers.ModelSerializer):
             "id",
             "photographer",
             "available_days",
-            "session_time",
+            "start_time",
+            "end_time",
             "min_notice_hours",
             "max_future_days",
             "allow_same_day",
@@ -191,8 +317,51 @@ class BookingPreferenceSerializer(serializers.ModelSerializer):
         ]
 
 
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """Query parameters of the availability endpoint."""
+    MAX_DAYS = 366
+
+    photographer = serializers.PrimaryKeyRelatedField(queryset=Photographer.objects.all())
+    package = serializers.PrimaryKeyRelatedField(
+        queryset=ServicePackage.objects.filter(is_active=True), required=False
+    )
+    duration = serializers.IntegerField(min_value=5, max_value=24 * 60, required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    step = serializers.IntegerField(min_value=5, max_value=24 * 60, default=SLOT_STEP_MINUTES)
+
+    def validate(self, data):
+        package = data.get('package')
+        if package and package.photographer_id != data['photographer'].id:
+            raise serializers.ValidationError({"package": "This package belongs to another photographer."})
+        data['duration'] = package.duration if package else data.get('duration', DEFAULT_SESSION_MINUTES)
+
+        today = timezone.localdate()
+        data['start'] = data.get('start') or today
+        data['end'] = data.get('end') or data['start'] + datetime.timedelta(days=30)
+        if data['end'] < data['start']:
+            raise serializers.ValidationError({"end": "Must not be before start."})
+        if (data['end'] - data['start']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError({"end": f"At most {self.MAX_DAYS} days per request."})
+        return data
+
+
+class DashboardQuerySerializer(serializers.Serializer):
+    """Query parameters of the dashboard endpoint: the last `months` calendar months."""
+    months = serializers.IntegerField(min_value=1, max_value=36, default=12)
+
+    def validate(self, data):
+        today = timezone.localdate()
+        start = today.replace(day=1)
+        for _ in range(data['months'] - 1):
+            start = (start - datetime.timedelta(days=1)).replace(day=1)
+        data['start'] = start
+        data['end'] = today
+        return data
+
+
 class ClientBookingsSerializer(serializers.ModelSerializer):
-    bookings = BookingSerializer(many=True, read_only=True, source="client_tags.booking_set")
+    bookings = BookingSerializer(many=True, read_only=True)
 
     class Meta:
         model = ClientTag
@@ -275,16 +444,26 @@ class GuestBookingCreateSerializer(serializers.ModelSerializer):
         client_data = validated_data.pop("client")
         photographer = validated_data["photographer"]
 
-        # Create/retrieve User + Client
-        guest_serializer = GuestClientSerializer(data=client_data, context={"photographer": photographer})
-        guest_serializer.is_valid(raise_exception=True)
-        client = guest_serializer.save()
-
-        # Set defaults
-        if not validated_data.get("package_price"):
-            validated_data["package_price"] = validated_data["service_package"].price
-
-        validated_data["client"] = client
-        validated_data["status"] = Booking.STATUS_PENDING
-
-        return Booking.objects.create(**validated_data)
+        with transaction.atomic():
+            # Checked before the guest's user and client rows are created
+            lock_photographer(photographer.id)
+            ensure_slot_free(
+                photographer,
+                validated_data["service_package"],
+                validated_data["session_date"],
+                validated_data.get("session_time"),
+            )
+
+            # Create/retrieve User + Client
+            guest_serializer = GuestClientSerializer(data=client_data, context={"photographer": photographer})
+            guest_serializer.is_valid(raise_exception=True)
+            client = guest_serializer.save()
+
+            # Set defaults
+            if not validated_data.get("package_price"):
+                validated_data["package_price"] = validated_data["service_package"].price
+
+            validated_data["client"] = client
+            validated_data["status"] = Booking.STATUS_PENDING
+
+            return Booking.objects.create(**validated_data)
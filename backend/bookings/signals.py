@@ -1,8 +1,9 @@
 # signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.db import transaction
 from .models import Booking, Payment
+from .utils import refresh_rollups_on_commit
 
 
 @receiver(post_save, sender=Booking)
@@ -29,14 +30,32 @@ def update_booking_status_on_payment(sender, instance, created, **kwargs):
         if instance.payment_status == Payment.STATUS_PAID:
             if booking.status != Booking.STATUS_CONFIRMED:
                 booking.status = Booking.STATUS_CONFIRMED
-                booking.save(update_fields=["status"])
+                booking.save(update_fields=["status", "updated_at"])
 
         elif instance.payment_status == Payment.STATUS_FAILED:
             if booking.status != Booking.STATUS_CANCELLED:
                 booking.status = Booking.STATUS_CANCELLED
-                booking.save(update_fields=["status"])
+                booking.save(update_fields=["status", "updated_at"])
 
         elif instance.payment_status == Payment.STATUS_PENDING:
             if booking.status != Booking.STATUS_PENDING:
                 booking.status = Booking.STATUS_PENDING
-                booking.save(update_fields=["status"])
+                booking.save(update_fields=["status", "updated_at"])
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def refresh_booking_rollups(sender, instance, **kwargs):
+    """Keep the dashboard rollups of the day the booking was made current"""
+    refresh_rollups_on_commit(instance.photographer_id, instance.created_at)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_revenue_rollups(sender, instance, **kwargs):
+    """Keep the dashboard rollups of the day the payment counts towards current"""
+    # Looked up now: on a cascading delete the booking is gone by commit time
+    photographer_id = (
+        Booking.objects.filter(pk=instance.booking_id).values_list("photographer_id", flat=True).first()
+    )
+    refresh_rollups_on_commit(photographer_id, instance.paid_at or instance.created_at)
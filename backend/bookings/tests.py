@@ -1,3 +1,110 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from django.core import mail
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import User
+from photographers.models import Client
+from .models import Booking, Payment
+from .serializers import BookingSerializer
+from .utils import calendar_feed_etag, dispatch_booking_reminders, ical_line
 
-# Create your tests here.
+
+class CalendarFeedEtagTests(TestCase):
+    def setUp(self):
+        photographer_user = User.objects.create_user(
+            username="photographer", password="pass12345", role=User.Roles.PHOTOGRAPHER
+        )
+        client_user = User.objects.create_user(username="client", password="pass12345")
+        self.photographer = photographer_user.photographer
+        self.booking = Booking.objects.create(
+            photographer=self.photographer,
+            client=Client.objects.create(photographer=self.photographer, user=client_user),
+            session_date=timezone.localdate() + datetime.timedelta(days=7),
+            package_price=Decimal("100.00"),
+        )
+        self.payment = self.booking.payments.get()
+
+    def assert_payment_changes_etag(self, payment_status, booking_status):
+        etag = calendar_feed_etag(self.photographer.id)
+        updated_at = self.booking.updated_at
+
+        self.payment.payment_status = payment_status
+        self.payment.save()
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, booking_status)
+        self.assertGreater(self.booking.updated_at, updated_at)
+        self.assertNotEqual(calendar_feed_etag(self.photographer.id), etag)
+
+    def test_paid_payment_confirming_booking_changes_etag(self):
+        self.assert_payment_changes_etag(Payment.STATUS_PAID, Booking.STATUS_CONFIRMED)
+
+    def test_failed_payment_cancelling_booking_changes_etag(self):
+        self.assert_payment_changes_etag(Payment.STATUS_FAILED, Booking.STATUS_CANCELLED)
+
+    def test_status_change_without_updated_at_changes_etag(self):
+        etag = calendar_feed_etag(self.photographer.id)
+        Booking.objects.filter(pk=self.booking.pk).update(status=Booking.STATUS_CANCELLED)
+        self.assertNotEqual(calendar_feed_etag(self.photographer.id), etag)
+
+    def test_feed_sends_no_last_modified(self):
+        self.photographer.calendar_token = "t" * 32
+        self.photographer.save(update_fields=["calendar_token"])
+        url = reverse("booking-calendar-feed", kwargs={"token": self.photographer.calendar_token})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+
+        # Deleting the latest edited booking must not leave pollers on a 304
+        self.booking.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+
+
+class IcalLineTests(SimpleTestCase):
+    def test_folded_lines_stay_within_75_octets(self):
+        for line in ("a" * 150, "a" * 149, "é" * 80):
+            folded = ical_line(line).encode().split(b"\r\n")[:-1]
+            self.assertLessEqual(max(len(part) for part in folded), 75)
+            self.assertEqual(b"".join(part[1:] if i else part for i, part in enumerate(folded)).decode(), line)
+
+
+class BookingReminderTests(TestCase):
+    def setUp(self):
+        photographer_user = User.objects.create_user(
+            username="photographer", password="pass12345", email="photographer@example.com",
+            role=User.Roles.PHOTOGRAPHER,
+        )
+        client_user = User.objects.create_user(username="client", password="pass12345", email="client@example.com")
+        photographer = photographer_user.photographer
+        self.now = timezone.make_aware(datetime.datetime(2030, 1, 10, 12, 0))
+        self.booking = Booking.objects.create(
+            photographer=photographer,
+            client=Client.objects.create(photographer=photographer, user=client_user),
+            session_date=datetime.date(2030, 1, 10),
+            session_time=datetime.time(13, 30),
+        )
+
+    def patch(self, data):
+        serializer = BookingSerializer(self.booking, data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def test_unchanged_session_time_keeps_sent_reminders(self):
+        self.assertEqual(dispatch_booking_reminders(now=self.now)["sent"], 2)
+
+        self.patch({"session_date": "2030-01-10", "session_time": "13:30", "notes": "Bring a tripod"})
+
+        self.assertEqual(self.booking.reminders.count(), 2)
+        self.assertEqual(dispatch_booking_reminders(now=self.now)["sent"], 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_moved_session_clears_sent_reminders(self):
+        dispatch_booking_reminders(now=self.now)
+
+        self.patch({"session_time": "14:00"})
+
+        self.assertEqual(self.booking.reminders.count(), 0)
@@ -12,6 +12,11 @@ from .views import (
     PaymentDetailView,
     ClientBookingsView,
     GuestBookingCreateView,
+    AvailabilityView,
+    DashboardView,
+    PaymentReconcileView,
+    CalendarFeedLinkView,
+    CalendarFeedView,
 )
 
 urlpatterns = [
@@ -33,6 +38,10 @@ urlpatterns = [
     # ----------------------
     path("bookings/", BookingListCreateView.as_view(), name="booking-list"),
     path("bookings/<int:pk>/", BookingDetailView.as_view(), name="booking-detail"),
+    path("availability/", AvailabilityView.as_view(), name="booking-availability"),
+    path("dashboard/", DashboardView.as_view(), name="booking-dashboard"),
+    path("calendar/", CalendarFeedLinkView.as_view(), name="booking-calendar-link"),
+    path("calendar/<str:token>.ics", CalendarFeedView.as_view(), name="booking-calendar-feed"),
 
     # ----------------------
     # Booking Preferences
@@ -44,6 +53,7 @@ urlpatterns = [
     # Payments
     # ----------------------
     path("payments/", PaymentListCreateView.as_view(), name="payment-list"),
+    path("payments/reconcile/", PaymentReconcileView.as_view(), name="payment-reconcile"),
     path("payments/<int:pk>/", PaymentDetailView.as_view(), name="payment-detail"),
     path("bookings/guest/", GuestBookingCreateView.as_view(), name="guest-booking-create"),
 ]
@@ -0,0 +1,689 @@
+import csv
+import datetime
+import hashlib
+import io
+import json
+import smtplib
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, DecimalField, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.utils import timezone
+from notification.models import NotificationSettings
+from photographers.models import Photographer
+from .models import Booking, BookingPreference, BookingReminder, DailyBookingRollup, DailyRevenueRollup, Payment
+
+# Used for bookings whose package (and so duration) is unknown
+DEFAULT_SESSION_MINUTES = 60
+
+# Spacing of the start times offered within a day
+SLOT_STEP_MINUTES = 30
+
+# Statuses that hold the photographer's time
+BLOCKING_STATUSES = [Booking.STATUS_PENDING, Booking.STATUS_CONFIRMED, Booking.STATUS_COMPLETED]
+
+WEEKDAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def parse_available_days(days):
+    """Weekday numbers (Monday is 0) from names like "Monday" or "mon"."""
+    weekdays = set()
+    for day in days or []:
+        if isinstance(day, int) and 0 <= day <= 6:
+            weekdays.add(day)
+            continue
+        name = str(day).strip().lower()
+        for number, weekday in enumerate(WEEKDAY_NAMES):
+            if len(name) >= 3 and weekday.startswith(name):
+                weekdays.add(number)
+    return weekdays
+
+
+def booked_intervals(photographer_id, start_date, end_date, exclude_booking_id=None):
+    """
+    The photographer's busy time between the two dates as sorted, merged
+    (start, end) local datetimes, from one query on (photographer, session_date).
+
+    A booking without a time blocks its whole day.
+    """
+    bookings = Booking.objects.filter(
+        photographer_id=photographer_id,
+        status__in=BLOCKING_STATUSES,
+        # Sessions from the day before can run past midnight
+        session_date__range=(start_date - datetime.timedelta(days=1), end_date),
+    )
+    if exclude_booking_id:
+        bookings = bookings.exclude(pk=exclude_booking_id)
+
+    intervals = [
+        session_interval(session_date, session_time, duration)
+        for session_date, session_time, duration in bookings.values_list(
+            "session_date", "session_time", "service_package__duration"
+        ).order_by()
+    ]
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def available_slots(photographer_id, duration, start_date, end_date, step=SLOT_STEP_MINUTES, now=None):
+    """
+    Map each date between start_date and end_date to the session start
+    times still free for a `duration` minute session, following the
+    photographer's BookingPreference. Dates without a free slot are left out.
+    """
+    preference = BookingPreference.objects.filter(photographer_id=photographer_id).first()
+    if preference is None:
+        return {}
+    weekdays = parse_available_days(preference.available_days)
+
+    # Session dates and times are local wall-clock times
+    now = timezone.localtime(now).replace(tzinfo=None)
+    earliest = now + datetime.timedelta(hours=preference.min_notice_hours)
+    if not preference.allow_same_day:
+        earliest = max(earliest, datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time.min))
+    start_date = max(start_date, earliest.date())
+    end_date = min(end_date, now.date() + datetime.timedelta(days=preference.max_future_days))
+    if not weekdays or start_date > end_date:
+        return {}
+
+    busy = booked_intervals(photographer_id, start_date, end_date)
+    length = datetime.timedelta(minutes=duration)
+    step = datetime.timedelta(minutes=step)
+    slots = {}
+    i = 0
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays:
+            slot = datetime.datetime.combine(day, preference.start_time or datetime.time.min)
+            if preference.end_time:
+                window_end = datetime.datetime.combine(day, preference.end_time)
+            else:
+                window_end = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min)
+
+            # Slots only move forward, so one pointer walks the busy list once
+            while slot + length <= window_end:
+                while i < len(busy) and busy[i][1] <= slot:
+                    i += 1
+                free = i == len(busy) or busy[i][0] >= slot + length
+                if free and slot >= earliest:
+                    slots.setdefault(day, []).append(slot.time())
+                slot += step
+        day += datetime.timedelta(days=1)
+    return slots
+
+
+def session_interval(session_date, session_time, duration=None):
+    """(start, end) local datetimes of a session; without a time it takes the whole day."""
+    if session_time is None:
+        start = datetime.datetime.combine(session_date, datetime.time.min)
+        return start, start + datetime.timedelta(days=1)
+    start = datetime.datetime.combine(session_date, session_time)
+    return start, start + datetime.timedelta(minutes=duration or DEFAULT_SESSION_MINUTES)
+
+
+def lock_photographer(photographer_id):
+    """
+    Lock the photographer's row until the transaction ends, so bookings for
+    the same photographer are checked and inserted one at a time.
+    """
+    list(Photographer.objects.select_for_update().filter(pk=photographer_id).values_list("id"))
+
+
+def find_overlap(photographer_id, session_date, session_time, duration=None, exclude_booking_id=None):
+    """The busy (start, end) interval the proposed session would overlap, or None."""
+    start, end = session_interval(session_date, session_time, duration)
+    for busy_start, busy_end in booked_intervals(
+        photographer_id, start.date(), end.date(), exclude_booking_id=exclude_booking_id
+    ):
+        if busy_start < end and start < busy_end:
+            return busy_start, busy_end
+    return None
+
+
+def local_day_bounds(start_date, end_date):
+    """Aware datetimes spanning the local days start_date..end_date."""
+    start = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min))
+    return start, end
+
+
+def rebuild_rollups(start_date, end_date, photographer_ids=None):
+    """
+    Recompute the dashboard rollups for the local days start_date..end_date,
+    for the given photographers or all of them, from two grouped queries.
+
+    Bookings count on the day they were made, payments on the day they were
+    paid (or recorded, when paid_at is missing). Returns the rows written.
+    """
+    start, end = local_day_bounds(start_date, end_date)
+
+    bookings = Booking.objects.filter(created_at__gte=start, created_at__lt=end)
+    payments = Payment.objects.filter(payment_status=Payment.STATUS_PAID).annotate(
+        paid_on=Coalesce("paid_at", "created_at")
+    ).filter(paid_on__gte=start, paid_on__lt=end)
+    booking_rows = DailyBookingRollup.objects.filter(date__range=(start_date, end_date))
+    revenue_rows = DailyRevenueRollup.objects.filter(date__range=(start_date, end_date))
+    if photographer_ids is not None:
+        bookings = bookings.filter(photographer_id__in=photographer_ids)
+        payments = payments.filter(booking__photographer_id__in=photographer_ids)
+        booking_rows = booking_rows.filter(photographer_id__in=photographer_ids)
+        revenue_rows = revenue_rows.filter(photographer_id__in=photographer_ids)
+
+    booking_rollups = [
+        DailyBookingRollup(
+            photographer_id=row["photographer_id"], date=row["day"], status=row["status"],
+            service_package_id=row["service_package_id"],
+            bookings_count=row["count"], booked_value=row["value"] or 0,
+        )
+        for row in bookings.annotate(day=TruncDate("created_at"))
+        .values("photographer_id", "day", "status", "service_package_id")
+        .annotate(count=Count("id"), value=Sum("package_price"))
+        .order_by()
+    ]
+    revenue_rollups = [
+        DailyRevenueRollup(
+            photographer_id=row["booking__photographer_id"], date=row["day"],
+            currency=row["booking__photographer__currency"],
+            amount=row["amount"] or 0, payments_count=row["count"],
+        )
+        for row in payments.annotate(day=TruncDate("paid_on"))
+        .values("booking__photographer_id", "day", "booking__photographer__currency")
+        .annotate(count=Count("id"), amount=Sum("amount_paid"))
+        .order_by()
+    ]
+
+    with transaction.atomic():
+        booking_rows.delete()
+        revenue_rows.delete()
+        DailyBookingRollup.objects.bulk_create(booking_rollups)
+        DailyRevenueRollup.objects.bulk_create(revenue_rollups)
+    return len(booking_rollups) + len(revenue_rollups)
+
+
+def refresh_rollups_on_commit(photographer_id, moment):
+    """Rebuild one photographer's rollups for the local day of `moment` once the transaction commits."""
+    if photographer_id is None or moment is None:
+        return
+    day = timezone.localdate(moment)
+    transaction.on_commit(lambda: rebuild_rollups(day, day, [photographer_id]))
+
+
+def dashboard_summary(photographer_id, start_date, end_date, top_packages=5):
+    """
+    Monthly revenue and bookings, bookings by status and the most booked
+    packages between the two dates, read from the rollup tables only.
+    """
+    revenue_rows = DailyRevenueRollup.objects.filter(
+        photographer_id=photographer_id, date__range=(start_date, end_date)
+    )
+    booking_rows = DailyBookingRollup.objects.filter(
+        photographer_id=photographer_id, date__range=(start_date, end_date)
+    )
+
+    months = {}
+
+    def month(value):
+        key = value.strftime("%Y-%m")
+        return months.setdefault(key, {"month": key, "revenue": {}, "payments": 0, "bookings": 0})
+
+    revenue = {}
+    for row in (
+        revenue_rows.annotate(month=TruncMonth("date"))
+        .values("month", "currency")
+        .annotate(amount=Sum("amount"), payments=Sum("payments_count"))
+        .order_by()
+    ):
+        entry = month(row["month"])
+        entry["revenue"][row["currency"]] = row["amount"]
+        entry["payments"] += row["payments"]
+        revenue[row["currency"]] = revenue.get(row["currency"], 0) + row["amount"]
+
+    for row in (
+        booking_rows.annotate(month=TruncMonth("date"))
+        .values("month")
+        .annotate(bookings=Sum("bookings_count"))
+        .order_by()
+    ):
+        month(row["month"])["bookings"] = row["bookings"]
+
+    by_status = {value: 0 for value, _ in Booking.BOOKING_STATUS}
+    for row in booking_rows.values("status").annotate(bookings=Sum("bookings_count")).order_by():
+        by_status[row["status"]] = row["bookings"]
+
+    packages = (
+        booking_rows.filter(service_package__isnull=False)
+        .values("service_package_id", "service_package__title")
+        .annotate(bookings=Sum("bookings_count"), booked_value=Sum("booked_value"))
+        .order_by("-bookings", "-booked_value")[:top_packages]
+    )
+
+    return {
+        "months": [months[key] for key in sorted(months)],
+        "revenue": revenue,
+        "bookings_by_status": by_status,
+        "top_packages": [
+            {
+                "id": row["service_package_id"],
+                "title": row["service_package__title"],
+                "bookings": row["bookings"],
+                "booked_value": row["booked_value"],
+            }
+            for row in packages
+        ],
+    }
+
+
+def with_client_totals(clients):
+    """
+    Annotate a Client queryset with total_bookings and total_spent (paid
+    payments), one correlated subquery each. Client rows are per
+    photographer, so the totals are too.
+    """
+    amount = DecimalField(max_digits=12, decimal_places=2)
+    bookings = (
+        Booking.objects.filter(client=OuterRef("pk"))
+        .order_by()
+        .values("client")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    spent = (
+        Payment.objects.filter(booking__client=OuterRef("pk"), payment_status=Payment.STATUS_PAID)
+        .order_by()
+        .values("booking__client")
+        .annotate(total=Sum("amount_paid"))
+        .values("total")
+    )
+    return clients.annotate(
+        total_bookings=Coalesce(Subquery(bookings, output_field=IntegerField()), Value(0)),
+        total_spent=Coalesce(Subquery(spent, output_field=amount), Value(Decimal("0.00")), output_field=amount),
+    )
+
+
+# Booking status a payment status moves its booking to, as in
+# signals.update_booking_status_on_payment; refunds leave the booking alone
+BOOKING_STATUS_FOR_PAYMENT = {
+    Payment.STATUS_PAID: Booking.STATUS_CONFIRMED,
+    Payment.STATUS_FAILED: Booking.STATUS_CANCELLED,
+    Payment.STATUS_PENDING: Booking.STATUS_PENDING,
+}
+
+
+def read_reconciliation_file(f, name):
+    """Rows of a reconciliation batch from a .json (list of objects) or CSV file."""
+    content = f.read()
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    if name.lower().endswith(".json"):
+        rows = json.loads(content)
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON list of rows.")
+        return rows
+    # Blank cells count as missing, so optional columns can be left empty
+    return [
+        {key.strip().lower(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in csv.DictReader(io.StringIO(content))
+    ]
+
+
+def reconcile_payments(rows, photographer_id=None, dry_run=False):
+    """
+    Apply a batch of validated {"row", "transaction_id", "status", "amount",
+    "paid_at"} changes: payments are matched by transaction id in one query,
+    updated with one UPDATE per target status and their bookings' statuses
+    synced with one UPDATE per booking status, instead of a save() and a
+    signal per payment.
+
+    Only the photographer's payments match when photographer_id is given.
+    Returns a report entry per row.
+    """
+    transaction_ids = {row["row"]: row["transaction_id"] for row in rows}
+    report = {}
+    latest = {}
+    for row in rows:
+        if row["transaction_id"] in latest:
+            report[latest[row["transaction_id"]]["row"]] = {"result": "duplicate"}
+        latest[row["transaction_id"]] = row
+    rows = [row for row in rows if row["row"] not in report]
+
+    payments = Payment.objects.filter(transaction_id__in=[row["transaction_id"] for row in rows])
+    if photographer_id is not None:
+        payments = payments.filter(booking__photographer_id=photographer_id)
+    found = {
+        payment["transaction_id"]: payment
+        for payment in payments.values(
+            "id", "transaction_id", "payment_status", "amount_paid", "paid_at", "booking_id",
+            "booking__status", "booking__photographer_id", "booking__created_at",
+        )
+    }
+
+    now = timezone.now()
+    changes = {}
+    booking_targets = {}
+    touched_days = set()
+    for row in rows:
+        payment = found.get(row["transaction_id"])
+        if payment is None:
+            report[row["row"]] = {"result": "not_found"}
+            continue
+        entry = report[row["row"]] = {"payment": payment["id"], "booking": payment["booking_id"]}
+        if row.get("amount") is not None and row["amount"] != payment["amount_paid"]:
+            entry.update(result="amount_mismatch", message=f"Recorded amount is {payment['amount_paid']}.")
+            continue
+
+        paid_at = payment["paid_at"]
+        if row["status"] == Payment.STATUS_PAID:
+            paid_at = row.get("paid_at") or paid_at or now
+        if row["status"] == payment["payment_status"] and paid_at == payment["paid_at"]:
+            entry["result"] = "unchanged"
+        else:
+            entry["result"] = "updated"
+            changes[payment["id"]] = (row["status"], paid_at)
+            touched_days.update(
+                (payment["booking__photographer_id"], timezone.localdate(moment))
+                for moment in (payment["paid_at"], paid_at) if moment
+            )
+
+        # Like the signal, the last payment row of a booking decides its status
+        target = BOOKING_STATUS_FOR_PAYMENT.get(row["status"])
+        if target is None:
+            continue
+        if target != payment["booking__status"]:
+            booking_targets[payment["booking_id"]] = (target, entry)
+            touched_days.add((payment["booking__photographer_id"], timezone.localdate(payment["booking__created_at"])))
+        else:
+            booking_targets.pop(payment["booking_id"], None)
+
+    for target, entry in booking_targets.values():
+        entry["booking_status"] = target
+
+    results = [
+        dict(report[number], row=number, transaction_id=transaction_ids[number])
+        for number in sorted(report)
+    ]
+    if dry_run:
+        return results
+
+    with transaction.atomic():
+        by_status = {}
+        for payment_id, (status, paid_at) in changes.items():
+            by_status.setdefault(status, {})[payment_id] = paid_at
+        for status, paid_at in by_status.items():
+            Payment.objects.filter(pk__in=paid_at).update(
+                payment_status=status,
+                paid_at=Case(
+                    *[When(pk=payment_id, then=Value(moment)) for payment_id, moment in paid_at.items()],
+                    default=F("paid_at"),
+                    output_field=DateTimeField(),
+                ),
+            )
+
+        by_target = {}
+        for booking_id, (target, _) in booking_targets.items():
+            by_target.setdefault(target, []).append(booking_id)
+        for target, booking_ids in by_target.items():
+            # update() skips auto_now, so updated_at is set here
+            Booking.objects.filter(pk__in=booking_ids).update(status=target, updated_at=now)
+
+        # update() skips the signals that keep the dashboard rollups current
+        if touched_days:
+            days = [day for _, day in touched_days]
+            photographer_ids = {photographer for photographer, _ in touched_days}
+            transaction.on_commit(lambda: rebuild_rollups(min(days), max(days), photographer_ids))
+
+    return results
+
+
+def calendar_feed_bookings(photographer_id, today=None):
+    """Bookings from today on that the photographer's calendar feed covers, cancelled ones included."""
+    today = today or timezone.localdate()
+    return Booking.objects.filter(photographer_id=photographer_id, session_date__gte=today)
+
+
+def calendar_feed_etag(photographer_id, today=None):
+    """
+    ETag of the feed from one aggregate query. The date and per-status row
+    counts are part of it so past sessions dropping out, deleted bookings
+    and status changes that skip updated_at change it too. There is no
+    Last-Modified: Max(updated_at) moves backwards when those rows go.
+    """
+    today = today or timezone.localdate()
+    state = calendar_feed_bookings(photographer_id, today).aggregate(
+        latest=Max("updated_at"),
+        count=Count("id"),
+        confirmed=Count("id", filter=Q(status=Booking.STATUS_CONFIRMED)),
+        cancelled=Count("id", filter=Q(status=Booking.STATUS_CANCELLED)),
+    )
+    latest = state["latest"]
+    key = (
+        f"{photographer_id}:{today}:{latest.isoformat() if latest else ''}:"
+        f"{state['count']}:{state['confirmed']}:{state['cancelled']}"
+    )
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def ical_text(value):
+    """Escape a value for an iCalendar TEXT property."""
+    return (
+        str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def ical_line(line):
+    """A content line folded at 75 octets, as RFC 5545 requires, with its CRLF."""
+    data = line.encode()
+    parts = []
+    # Continuation lines start with a space, so they hold one octet less
+    while len(data) > (75 if not parts else 74):
+        cut = 75 if not parts else 74
+        # Do not split a multi-byte UTF-8 character
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+    parts.append(data)
+    return b"\r\n ".join(parts).decode() + "\r\n"
+
+
+def ical_utc(moment):
+    return moment.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def booking_ical_event(booking):
+    """The VEVENT of one booking, with client, package and service_package loaded."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:booking-{booking.pk}@{settings.BASE_DOMAIN}",
+        f"DTSTAMP:{ical_utc(booking.updated_at)}",
+        f"LAST-MODIFIED:{ical_utc(booking.updated_at)}",
+    ]
+    package = booking.service_package
+    start, end = session_interval(booking.session_date, booking.session_time, package.duration if package else None)
+    if booking.session_time is None:
+        lines += [f"DTSTART;VALUE=DATE:{start:%Y%m%d}", f"DTEND;VALUE=DATE:{end:%Y%m%d}"]
+    else:
+        lines += [
+            f"DTSTART:{ical_utc(timezone.make_aware(start))}",
+            f"DTEND:{ical_utc(timezone.make_aware(end))}",
+        ]
+
+    client = booking.client.user.get_full_name() or booking.client.user.username
+    summary = f"{package.title} - {client}" if package else client
+    lines.append(f"SUMMARY:{ical_text(summary)}")
+    if booking.location:
+        lines.append(f"LOCATION:{ical_text(booking.location)}")
+    if booking.notes:
+        lines.append(f"DESCRIPTION:{ical_text(booking.notes)}")
+    status = "TENTATIVE" if booking.status == Booking.STATUS_PENDING else "CONFIRMED"
+    lines += [f"STATUS:{status}", "END:VEVENT"]
+    return "".join(ical_line(line) for line in lines)
+
+
+def ical_feed(photographer, today=None, chunk_size=500):
+    """
+    Yield the photographer's calendar feed piece by piece while iterating
+    over the indexed (photographer, session_date) range in chunks.
+    """
+    yield "".join(ical_line(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:-//{settings.BASE_DOMAIN}//Bookings//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{ical_text(photographer.user.get_full_name() or photographer.user.username)} bookings",
+    ])
+    bookings = (
+        calendar_feed_bookings(photographer.id, today)
+        .exclude(status=Booking.STATUS_CANCELLED)
+        .select_related("client__user", "service_package")
+        .order_by("session_date", "session_time")
+    )
+    for booking in bookings.iterator(chunk_size=chunk_size):
+        yield booking_ical_event(booking)
+    yield ical_line("END:VCALENDAR")
+
+
+def due_reminders(now=None, windows=None):
+    """
+    (booking, user, hours_before) of every reminder due at `now`: the
+    smallest window the session has entered, for the photographer and the
+    client, unless that recipient already got it or a later one.
+
+    Upcoming bookings come from one query on (session_date, status), the
+    recipients' notification settings and past reminders from one each.
+    Returns (due, deferred): deferred reminders fall in the recipient's
+    quiet hours and are picked up by a later run.
+    """
+    now = now or timezone.now()
+    windows = sorted(windows or settings.BOOKING_REMINDER_HOURS)
+    horizon = timezone.localtime(now + datetime.timedelta(hours=windows[-1]))
+    bookings = list(
+        Booking.objects.filter(
+            status__in=[Booking.STATUS_PENDING, Booking.STATUS_CONFIRMED],
+            session_date__range=(timezone.localdate(now), horizon.date()),
+        ).select_related("client__user", "photographer__user", "service_package")
+    )
+
+    candidates = []
+    for booking in bookings:
+        start, _ = session_interval(booking.session_date, booking.session_time)
+        start = timezone.make_aware(start)
+        if start <= now:
+            continue
+        hours_before = next((hours for hours in windows if start - datetime.timedelta(hours=hours) <= now), None)
+        if hours_before is None:
+            continue
+        for user in (booking.photographer.user, booking.client.user):
+            if user.email:
+                candidates.append((booking, user, hours_before))
+
+    booking_ids = [booking.id for booking, _, _ in candidates]
+    sent = {}
+    for booking_id, user_id, hours in BookingReminder.objects.filter(booking_id__in=booking_ids).values_list(
+        "booking_id", "user_id", "hours_before"
+    ):
+        key = (booking_id, user_id)
+        sent[key] = min(hours, sent.get(key, hours))
+    preferences = NotificationSettings.objects.in_bulk(
+        {user.id for _, user, _ in candidates}, field_name="user_id"
+    )
+
+    due, deferred = [], []
+    for booking, user, hours_before in candidates:
+        if sent.get((booking.id, user.id), hours_before + 1) <= hours_before:
+            continue
+        preference = preferences.get(user.id)
+        # Users who never saved their settings get the defaults: reminders by email
+        if preference and not (preference.booking_reminders and preference.email_notifications):
+            continue
+        if preference and preference.in_quiet_hours(now):
+            deferred.append((booking, user, hours_before))
+        else:
+            due.append((booking, user, hours_before))
+    return due, deferred
+
+
+def booking_reminder_email(booking, user):
+    """The reminder EmailMessage for one recipient of a booking."""
+    start, _ = session_interval(booking.session_date, booking.session_time)
+    when = f"{start:%A %d %B %Y}" if booking.session_time is None else f"{start:%A %d %B %Y at %H:%M}"
+    package = booking.service_package.title if booking.service_package else "Session"
+    if user.id == booking.photographer.user_id:
+        other = booking.client.user.get_full_name() or booking.client.user.username
+    else:
+        other = booking.photographer.user.get_full_name() or booking.photographer.user.username
+
+    lines = [f"Hi {user.first_name or user.username},", "", f"This is a reminder of your {package} with {other} on {when}."]
+    if booking.location:
+        lines.append(f"Location: {booking.location}")
+    return EmailMessage(
+        subject=f"Reminder: {package} on {when}",
+        body="\n".join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def dispatch_booking_reminders(now=None, batch_size=100):
+    """
+    Send the due booking reminders in batches, each over one SMTP connection.
+
+    Every reminder row is claimed (inserted under the unique booking, user
+    and window constraint) before its email is sent, so overlapping runs or
+    retries cannot send it twice. When the connection fails, the claims of
+    the emails not yet sent are released for the next run; an address the
+    server refuses keeps its claim and is not retried.
+    Returns counts of sent, deferred and failed reminders.
+    """
+    now = now or timezone.now()
+    due, deferred = due_reminders(now)
+    counts = {"sent": 0, "deferred": len(deferred), "failed": 0}
+
+    for offset in range(0, len(due), batch_size):
+        batch = due[offset:offset + batch_size]
+        claim = uuid.uuid4().hex
+        BookingReminder.objects.bulk_create(
+            [BookingReminder(booking=booking, user=user, hours_before=hours, claim=claim) for booking, user, hours in batch],
+            ignore_conflicts=True,
+        )
+        claimed = {
+            (booking_id, user_id, hours): pk
+            for pk, booking_id, user_id, hours in BookingReminder.objects.filter(claim=claim).values_list(
+                "pk", "booking_id", "user_id", "hours_before"
+            )
+        }
+        batch = [
+            (claimed[(booking.id, user.id, hours)], booking, user)
+            for booking, user, hours in batch if (booking.id, user.id, hours) in claimed
+        ]
+
+        sent, unsent = [], [pk for pk, _, _ in batch]
+        connection = get_connection()
+        try:
+            connection.open()
+            for pk, booking, user in batch:
+                try:
+                    connection.send_messages([booking_reminder_email(booking, user)])
+                    sent.append(pk)
+                except smtplib.SMTPRecipientsRefused:
+                    counts["failed"] += 1
+                unsent.remove(pk)
+        except (smtplib.SMTPException, OSError):
+            counts["failed"] += len(unsent)
+        finally:
+            connection.close()
+
+        BookingReminder.objects.filter(pk__in=sent).update(sent_at=timezone.now())
+        BookingReminder.objects.filter(pk__in=unsent).delete()
+        counts["sent"] += len(sent)
+    return counts
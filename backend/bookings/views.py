@@ -2,6 +2,8 @@ from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
+from django.db.models import Prefetch
+import csv
 from .models import ServicePackage, Booking, BookingPreference, Payment
 from photographers.models import Client as ClientTag, Photographer
 from .serializers import (
@@ -13,8 +15,21 @@ from .serializers import (
     BookingPreferenceSerializer,
     ClientBookingsSerializer,
     GuestBookingCreateSerializer,
-    
+    AvailabilityQuerySerializer,
+    BookingFilterSerializer,
+    DashboardQuerySerializer,
+    PaymentReconcileSerializer,
 )
+from .utils import available_slots, dashboard_summary, read_reconciliation_file
+from .utils import calendar_feed_etag, ical_feed
+from accounts.idempotency import IdempotentPostMixin
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import get_random_string
+from django.utils.http import quote_etag
 
 
 # ----------------------
@@ -78,6 +93,42 @@ class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
+class PaymentReconcileView(APIView):
+    """
+    Apply a batch of payment statuses, e.g. from a bank statement: either
+    JSON {"rows": [{"transaction_id", "status", "amount", "paid_at"}, ...]}
+    or a CSV/JSON upload in "file" with the same columns. Add dry_run to
+    only get the report. Only the photographer's own payments are matched.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if not hasattr(request.user, "photographer"):
+            raise PermissionDenied("You are not a registered photographer.")
+
+        data = request.data
+        upload = request.FILES.get("file")
+        if upload:
+            try:
+                rows = read_reconciliation_file(upload, upload.name)
+            except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                return Response({"file": [f"Could not read the file: {e}"]}, status=status.HTTP_400_BAD_REQUEST)
+            data = {"rows": rows, "dry_run": request.data.get("dry_run", False)}
+
+        serializer = PaymentReconcileSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        report = serializer.save(photographer_id=request.user.photographer.id)
+
+        summary = {}
+        for entry in report:
+            summary[entry["result"]] = summary.get(entry["result"], 0) + 1
+        return Response({
+            "dry_run": serializer.validated_data["dry_run"],
+            "summary": summary,
+            "rows": report,
+        })
+
+
 # ----------------------
 # 📌 Booking Views
 # ----------------------
@@ -90,7 +141,9 @@ class BookingListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, "photographer"):
-            return Booking.objects.filter(photographer=user.photographer)
+            filters = BookingFilterSerializer(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            return filters.filter_queryset(Booking.objects.filter(photographer=user.photographer).for_list())
         return Booking.objects.none()
 
     def perform_create(self, serializer):
@@ -105,7 +158,7 @@ class BookingDetailView(APIView):
 
     def patch(self, request, pk):
         try:
-            booking = Booking.objects.get(pk=pk)
+            booking = Booking.objects.for_list().get(pk=pk)
             serializer = BookingSerializer(booking, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
@@ -143,16 +196,148 @@ class ClientBookingsView(generics.RetrieveAPIView):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, "photographer"):
-            return ClientTag.objects.filter(photographer=user.photographer)
+            return ClientTag.objects.filter(photographer=user.photographer).prefetch_related(
+                Prefetch("bookings", queryset=Booking.objects.for_list())
+            )
         return ClientTag.objects.none()
 
 
 # ----------------------
 # 📌 Guest Booking Create View
 # ----------------------
-class GuestBookingCreateView(generics.CreateAPIView):
+class GuestBookingCreateView(IdempotentPostMixin, generics.CreateAPIView):
     serializer_class = GuestBookingCreateSerializer
     permission_classes = [permissions.AllowAny]
+    # Retries sent with the same Idempotency-Key get the first response
+    idempotency_scope = "guest-booking"
 
     def perform_create(self, serializer):
-        serializer.save()
\ No newline at end of file
+        serializer.save()
+
+
+# ----------------------
+# 📌 Availability View
+# ----------------------
+class AvailabilityView(APIView):
+    """
+    Free session start times for a photographer, e.g.
+    ?photographer=1&package=3&start=2025-01-01&end=2025-06-30
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        slots = available_slots(
+            params["photographer"].id, params["duration"], params["start"], params["end"], step=params["step"]
+        )
+        return Response({
+            "photographer": params["photographer"].id,
+            "package": params["package"].id if params.get("package") else None,
+            "duration": params["duration"],
+            "step": params["step"],
+            "timezone": settings.TIME_ZONE,
+            "days": [
+                {"date": day, "slots": [slot.strftime("%H:%M") for slot in times]}
+                for day, times in slots.items()
+            ],
+        })
+
+
+# ----------------------
+# 📌 Dashboard View
+# ----------------------
+class DashboardView(APIView):
+    """
+    Revenue and booking figures for the photographer's dashboard, e.g. ?months=12.
+    Served from the daily rollup tables rather than the raw bookings.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if not hasattr(request.user, "photographer"):
+            raise PermissionDenied("You are not a registered photographer.")
+        query = DashboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        summary = dashboard_summary(request.user.photographer.id, params["start"], params["end"])
+        return Response({
+            "start": params["start"],
+            "end": params["end"],
+            "timezone": settings.TIME_ZONE,
+            **summary,
+        })
+
+
+# ----------------------
+# 📌 Calendar Feed Views
+# ----------------------
+class CalendarFeedLinkView(APIView):
+    """
+    The photographer's private .ics feed URL. GET returns it (creating the
+    token on first use), POST replaces the token and DELETE turns the feed off.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_photographer(self, request):
+        if not hasattr(request.user, "photographer"):
+            raise PermissionDenied("You are not a registered photographer.")
+        return request.user.photographer
+
+    def feed_response(self, request, photographer):
+        if not photographer.calendar_token:
+            return Response({"url": None, "webcal_url": None})
+        url = request.build_absolute_uri(
+            reverse("booking-calendar-feed", kwargs={"token": photographer.calendar_token})
+        )
+        return Response({"url": url, "webcal_url": "webcal://" + url.split("://", 1)[1]})
+
+    def get(self, request):
+        photographer = self.get_photographer(request)
+        if not photographer.calendar_token:
+            photographer.calendar_token = get_random_string(32)
+            photographer.save(update_fields=["calendar_token"])
+        return self.feed_response(request, photographer)
+
+    def post(self, request):
+        photographer = self.get_photographer(request)
+        photographer.calendar_token = get_random_string(32)
+        photographer.save(update_fields=["calendar_token"])
+        return self.feed_response(request, photographer)
+
+    def delete(self, request):
+        photographer = self.get_photographer(request)
+        photographer.calendar_token = None
+        photographer.save(update_fields=["calendar_token"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CalendarFeedView(APIView):
+    """
+    Upcoming bookings as an iCalendar feed, authenticated by the token in
+    the URL. The ETag comes from one aggregate over the feed's bookings, so
+    a poll with If-None-Match is usually a 304.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def perform_content_negotiation(self, request, force=False):
+        # Calendar apps ask for text/calendar, which no DRF renderer offers
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, token):
+        photographer = get_object_or_404(Photographer.objects.select_related("user"), calendar_token=token)
+
+        etag = quote_etag(calendar_feed_etag(photographer.id))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(ical_feed(photographer), content_type="text/calendar; charset=utf-8")
+            response["Content-Disposition"] = 'inline; filename="bookings.ics"'
+
+        response["ETag"] = etag
+        # Calendar apps must check back with the ETag instead of trusting a stale copy
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -5,6 +5,7 @@ from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from django.utils.crypto import get_random_string
 from photographers.models import Client, Photographer
+from accounts.idempotency import idempotent_response
 from .models import MessageThread, Message
 from .serializers import MessageThreadSerializer, MessageSerializer, SendReplySerializer
 from rest_framework.permissions import IsAuthenticated
@@ -45,6 +46,10 @@ class SendMessageView(APIView):
     permission_classes = []
 
     def post(self, request):
+        # Retries sent with the same Idempotency-Key get the first response
+        return idempotent_response(request, "send-message", lambda: self.send_message(request))
+
+    def send_message(self, request):
         content = request.data.get("content")
         photographer_id = request.data.get("photographer_id")
         client_email = request.data.get("email")
@@ -115,6 +115,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLite ignores select_for_update; taking the write lock at BEGIN
+        # keeps the booking overlap check and insert from interleaving
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
@@ -181,6 +184,36 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024   # 10MB
 
+# Largest image (width * height) we will decode; bigger uploads are rejected
+IMAGE_MAX_PIXELS = 100 * 1000 * 1000  # 100MP
+
+# Access-checked photo serving hands the transfer to the front proxy when set.
+# nginx: "X-Accel-Redirect", with MEDIA_ACCEL_PREFIX an `internal` location
+# aliasing MEDIA_ROOT. Apache/lighttpd: "X-Sendfile", which gets a file path.
+# Empty streams the file from Django (with Range support) instead.
+MEDIA_ACCEL_HEADER = os.getenv("MEDIA_ACCEL_HEADER", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# Deleted galleries and photos stay restorable for this long before purge_trash removes them
+TRASH_RETENTION_DAYS = 30
+
+# send_booking_reminders emails photographer and client this many hours before a session
+BOOKING_REMINDER_HOURS = [24, 2]
+
+# Responses of POSTs sent with an Idempotency-Key header are replayed to retries this long
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# Media directories cleanup_orphan_media sweeps by default: the upload_to roots of
+# model file fields. Files saved without a row (e.g. bg_removed/) are left alone.
+MEDIA_GC_DIRS = [
+    "profile_pictures",
+    "gallery_photos",
+    "renditions",
+    "watermark_logos",
+    "studio_covers",
+    "ai_tools",
+]
+
 # MEDIA_URL = '/media/'
 # MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -196,7 +229,7 @@ CRISPY_TEMPLATE_PACK = "tailwind"
 
 CRONJOBS = [
     # Runs every Sunday at 2 AM
-    ('0 2 * * 0', 'django.core.management.call_command', ['cleanup_profile_pictures']),
+    ('0 2 * * 0', 'django.core.management.call_command', ['cleanup_orphan_media']),
 ]
 
 # settings.py
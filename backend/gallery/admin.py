@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Gallery, Photo, GalleryPreference
+from .models import Gallery, Photo, GalleryPreference, FileDeletion
 
 @admin.register(Gallery)
 class GalleryAdmin(admin.ModelAdmin):
@@ -11,7 +11,7 @@ class GalleryAdmin(admin.ModelAdmin):
 
 @admin.register(Photo)
 class PhotoAdmin(admin.ModelAdmin):
-    list_display = ('id', 'gallery', 'caption', 'uploaded_at')
+    list_display = ('id', 'gallery', 'caption', 'file_size', 'uploaded_at')
     list_filter = ('uploaded_at', 'gallery')
     search_fields = ('caption', 'gallery__title')
     ordering = ('-uploaded_at',)
@@ -53,4 +53,13 @@ class GalleryPreferenceAdmin(admin.ModelAdmin):
         ("System", {
             "fields": ("updated_at",),
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(FileDeletion)
+class FileDeletionAdmin(admin.ModelAdmin):
+    list_display = ("path", "status", "attempts", "created_at", "processed_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("path",)
+    readonly_fields = ("created_at", "processed_at", "last_error")
+    ordering = ("-created_at",)
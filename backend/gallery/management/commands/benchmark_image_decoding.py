@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from PIL import Image
+from django.core.management.base import BaseCommand
+from aitools.utils import BACKGROUND_REMOVAL_MAX_SIZE
+from gallery.utils import PLACEHOLDER_SIZE, RENDITION_MAX_SIZE, load_image
+
+# (label, max_size) for each call site; None is a plain full-resolution decode
+CASES = [
+    ("full decode (Image.open + load)", None),
+    ("rendition", (RENDITION_MAX_SIZE, RENDITION_MAX_SIZE)),
+    ("background removal", BACKGROUND_REMOVAL_MAX_SIZE),
+    ("upload placeholder", (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4)),
+]
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def write_sample(path, megapixels, fmt):
+    """Write a noisy (so poorly compressible) image of roughly `megapixels` to `path`."""
+    side = int((megapixels * 1000 * 1000 * 1.5) ** 0.5)
+    size = (side, side * 2 // 3)
+    Image.effect_noise(size, 64).convert("RGB").save(path, format=fmt, quality=90)
+
+
+def decode(path, max_size, results):
+    """Decode `path` the way one call site would and report the RSS it added."""
+    baseline = peak_rss_bytes()
+    started = time.perf_counter()
+    if max_size is None:
+        with Image.open(path) as img:
+            img.load()
+            size = img.size
+    else:
+        with open(path, "rb") as f:
+            img, _ = load_image(f, max_size, max_pixels=sys.maxsize)
+            size = img.size
+    results.put((peak_rss_bytes() - baseline, time.perf_counter() - started, size))
+
+
+class Command(BaseCommand):
+    help = "Measure peak memory and time to decode a large image at each call site's resolution."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--megapixels", type=float, default=50)
+        parser.add_argument("--format", choices=["JPEG", "PNG"], default="JPEG")
+        parser.add_argument("--runs", type=int, default=3)
+
+    def handle(self, *args, **options):
+        # Every measurement runs in a fresh process, as peak RSS never goes back down
+        ctx = multiprocessing.get_context("fork")
+        fmt = options["format"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"sample.{fmt.lower()}")
+            writer = ctx.Process(target=write_sample, args=(path, options["megapixels"], fmt))
+            writer.start()
+            writer.join()
+            with Image.open(path) as img:
+                source_size = img.size
+            self.stdout.write(
+                f"Sample {fmt}: {source_size[0]}x{source_size[1]}, "
+                f"{os.path.getsize(path) / 1024 / 1024:.1f}MB on disk"
+            )
+
+            for label, max_size in CASES:
+                peaks, timings = [], []
+                for _ in range(options["runs"]):
+                    results = ctx.Queue()
+                    worker = ctx.Process(target=decode, args=(path, max_size, results))
+                    worker.start()
+                    peak, elapsed, size = results.get()
+                    worker.join()
+                    peaks.append(peak)
+                    timings.append(elapsed)
+                self.stdout.write(
+                    f"{label:<34} {size[0]:>6}x{size[1]:<6} "
+                    f"peak +{max(peaks) / 1024 / 1024:7.1f}MB  {min(timings) * 1000:8.1f}ms"
+                )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from gallery.models import Photo, PhotoRendition
+from gallery.utils import available_rendition_formats, generate_renditions
+
+
+class Command(BaseCommand):
+    help = "Generate dimensions, placeholders and WebP/AVIF renditions for photos missing them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Regenerate for every photo, not only those missing something.",
+        )
+        parser.add_argument(
+            "--retry-failed", action="store_true",
+            help="Also retry photos whose image could not be decoded before.",
+        )
+
+    def handle(self, *args, **options):
+        formats = available_rendition_formats()
+        photos = Photo.objects.exclude(image="").only("id", "image").order_by("id")
+        if not options["all"]:
+            missing = Q(placeholder="")
+            for fmt in formats:
+                missing |= ~Exists(PhotoRendition.objects.filter(photo=OuterRef("pk"), format=fmt))
+            photos = photos.filter(missing)
+            if not options["retry_failed"]:
+                # Undecodable images would otherwise come back every run and take the batch
+                photos = photos.filter(rendition_failed_at__isnull=True)
+
+        done = failed = 0
+        last_id = 0
+        # Page by id rather than a server-side cursor: each photo is updated as we go
+        while True:
+            batch = list(photos.filter(id__gt=last_id)[:options["batch_size"]])
+            if not batch:
+                break
+            for photo in batch:
+                if generate_renditions(photo, formats):
+                    done += 1
+                else:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"Could not decode photo {photo.id}: {photo.image.name}"))
+            last_id = batch[-1].id
+
+        self.stdout.write(self.style.SUCCESS(f"Generated renditions for {done} photos, {failed} failed."))
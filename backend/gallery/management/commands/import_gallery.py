@@ -0,0 +1,257 @@
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePosixPath
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from gallery.models import Gallery, Photo, PhotoRendition, sharded_photo_path
+from gallery.utils import append_order_keys, available_rendition_formats, render_photo
+from subscription.utils import adjust_storage_used, update_user_stats
+
+# Each worker process keeps its own handle per archive instead of re-reading
+# the central directory for every member
+_worker_archives = {}
+
+
+def open_source_file(source, member, archive=None):
+    """Open `member` of a directory `source`, or of the ZipFile `archive`."""
+    if archive is not None:
+        return archive.open(member)
+    return open(os.path.join(source, member), "rb")
+
+
+def prepare_photo(source, member, formats):
+    """Worker: decode one file into its dimensions, placeholder and renditions."""
+    archive = None
+    if not os.path.isdir(source):
+        if source not in _worker_archives:
+            _worker_archives[source] = zipfile.ZipFile(source)
+        archive = _worker_archives[source]
+    try:
+        with open_source_file(source, member, archive) as f:
+            return render_photo(f, formats)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return {"error": str(e) or e.__class__.__name__}
+
+
+def list_source_files(source):
+    """Yield (member, size) for every image below `source`, in a stable order."""
+    extensions = set(Image.registered_extensions())
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            infos = [info for info in archive.infolist() if not info.is_dir()]
+        entries = [(info.filename, info.file_size) for info in infos]
+    else:
+        entries = []
+        for root, dirs, files in os.walk(source):
+            for name in files:
+                path = os.path.join(root, name)
+                member = os.path.relpath(path, source).replace(os.sep, "/")
+                entries.append((member, os.path.getsize(path)))
+
+    for member, size in sorted(entries):
+        parts = PurePosixPath(member).parts
+        # Skip hidden files and folders, including macOS resource forks
+        if any(part.startswith((".", "__MACOSX")) for part in parts):
+            continue
+        if PurePosixPath(member).suffix.lower() in extensions:
+            yield member, size
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a directory tree or ZIP of photos into a gallery, one sub-gallery "
+        "per folder. Progress is kept in a JSON manifest so an interrupted import "
+        "resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Directory or .zip file to import.")
+        parser.add_argument("--user", required=True, help="Username or id of the owner.")
+        parser.add_argument("--title", help="Title of the top gallery (default: source name).")
+        parser.add_argument(
+            "--gallery", type=int,
+            help="Import into this existing gallery instead of creating a top gallery.",
+        )
+        parser.add_argument(
+            "--manifest",
+            help="Manifest path (default: <source>.import.json next to the source).",
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--skip-renditions", action="store_true",
+            help="Only compute dimensions and placeholders; leave WebP/AVIF to generate_renditions.",
+        )
+
+    def handle(self, *args, **options):
+        source = os.path.abspath(options["source"].rstrip("/\\"))
+        if not os.path.isdir(source) and not zipfile.is_zipfile(source):
+            raise CommandError(f"{source} is neither a directory nor a ZIP file.")
+
+        user = self.get_user(options["user"])
+        manifest_path = options["manifest"] or f"{source}.import.json"
+        manifest = self.load_manifest(manifest_path, source, user)
+        formats = [] if options["skip_renditions"] else available_rendition_formats()
+
+        files = [(m, size) for m, size in list_source_files(source) if m not in manifest["photos"]]
+        self.stdout.write(
+            f"{len(manifest['photos'])} files already imported, {len(files)} to go."
+        )
+
+        galleries = self.ensure_galleries(manifest, manifest_path, source, user, files, options)
+
+        imported = failed = 0
+        batch_size = options["batch_size"]
+        batches = [files[i:i + batch_size] for i in range(0, len(files), batch_size)]
+
+        # Workers must not inherit open database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            pending = None
+            # Keep one batch decoding while the previous one is stored
+            for batch in batches:
+                futures = [pool.submit(prepare_photo, source, member, formats) for member, _ in batch]
+                if pending:
+                    done, errors = self.store_batch(source, user, galleries, manifest, manifest_path, *pending)
+                    imported += done
+                    failed += errors
+                pending = (batch, futures)
+            if pending:
+                done, errors = self.store_batch(source, user, galleries, manifest, manifest_path, *pending)
+                imported += done
+                failed += errors
+
+        update_user_stats(user)
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {imported} photos, {failed} could not be read.")
+        )
+
+    def get_user(self, value):
+        User = get_user_model()
+        lookup = {"pk": value} if value.isdigit() else {"username": value}
+        try:
+            return User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f"No user {value!r}.")
+
+    def load_manifest(self, path, source, user):
+        if not os.path.exists(path):
+            return {"source": source, "user": user.pk, "galleries": {}, "photos": {}, "failed": {}}
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("source") != source or manifest.get("user") != user.pk:
+            raise CommandError(f"{path} belongs to a different import.")
+        return manifest
+
+    def save_manifest(self, path, manifest):
+        """Write the manifest atomically so a crash never leaves it half written."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def ensure_galleries(self, manifest, manifest_path, source, user, files, options):
+        """Create a sub-gallery per new folder and return {id: Gallery} for all of them."""
+        known = manifest["galleries"]
+        if "" not in known:
+            if options["gallery"]:
+                root = Gallery.objects.filter(pk=options["gallery"], user=user).first()
+                if root is None:
+                    raise CommandError(f"{user} has no gallery {options['gallery']}.")
+            else:
+                title = options["title"] or os.path.splitext(os.path.basename(source))[0]
+                root = Gallery.objects.create(user=user, title=title)
+            known[""] = root.pk
+
+        folders = set()
+        for member, _ in files:
+            parent = PurePosixPath(member).parent
+            while str(parent) != ".":
+                folders.add(str(parent))
+                parent = parent.parent
+
+        # Parents sort before their children
+        for folder in sorted(folders - set(known), key=lambda f: (f.count("/"), f)):
+            parent_folder = str(PurePosixPath(folder).parent)
+            parent_id = known["" if parent_folder == "." else parent_folder]
+            gallery = Gallery.objects.create(
+                user=user, title=PurePosixPath(folder).name, parent_gallery_id=parent_id
+            )
+            known[folder] = gallery.pk
+        self.save_manifest(manifest_path, manifest)
+
+        return Gallery.objects.in_bulk(known.values())
+
+    def store_batch(self, source, user, galleries, manifest, manifest_path, batch, futures):
+        """Copy one decoded batch into storage and insert its rows with bulk_create."""
+        # Opened per batch: a handle shared with forked workers would share its file offset
+        archive = None if os.path.isdir(source) else zipfile.ZipFile(source)
+        try:
+            photos, members, renditions, failed = self.copy_originals(
+                source, archive, user, galleries, manifest, batch, futures
+            )
+        finally:
+            if archive is not None:
+                archive.close()
+
+        if photos:
+            with transaction.atomic():
+                # bulk_create skips save() and post_save, so order keys and storage are set here
+                append_order_keys(photos)
+                Photo.objects.bulk_create(photos)
+                rendition_rows = []
+                for photo, rendered in zip(photos, renditions):
+                    width, height = rendered["rendition_size"]
+                    for fmt, data in rendered["renditions"].items():
+                        rendition_name = default_storage.save(
+                            f"renditions/photo_{photo.pk}.{fmt}", ContentFile(data)
+                        )
+                        rendition_rows.append(PhotoRendition(
+                            photo=photo, format=fmt, file=rendition_name,
+                            file_size=len(data), width=width, height=height,
+                        ))
+                PhotoRendition.objects.bulk_create(rendition_rows)
+                adjust_storage_used(
+                    user.pk,
+                    sum(p.file_size for p in photos) + sum(r.file_size for r in rendition_rows),
+                )
+
+        for member, photo in zip(members, photos):
+            manifest["photos"][member] = photo.pk
+            manifest["failed"].pop(member, None)
+        self.save_manifest(manifest_path, manifest)
+        return len(photos), failed
+
+    def copy_originals(self, source, archive, user, galleries, manifest, batch, futures):
+        """Save each decoded file of the batch to storage and build its unsaved Photo."""
+        photos, members, renditions = [], [], []
+        failed = 0
+        for (member, size), future in zip(batch, futures):
+            rendered = future.result()
+            if "error" in rendered:
+                failed += 1
+                manifest["failed"][member] = rendered["error"]
+                self.stdout.write(self.style.WARNING(f"Could not read {member}: {rendered['error']}"))
+                continue
+
+            folder = str(PurePosixPath(member).parent)
+            gallery = galleries[manifest["galleries"]["" if folder == "." else folder]]
+            with open_source_file(source, member, archive) as f:
+                name = default_storage.save(
+                    sharded_photo_path(user.pk, PurePosixPath(member).name), File(f)
+                )
+            photos.append(Photo(
+                gallery=gallery, image=name, file_size=size,
+                width=rendered["width"], height=rendered["height"],
+                placeholder=rendered["placeholder"],
+            ))
+            members.append(member)
+            renditions.append(rendered)
+        return photos, members, renditions, failed
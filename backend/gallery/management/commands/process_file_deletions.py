@@ -0,0 +1,74 @@
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from accounts.utils import referenced_media_names
+from gallery.models import FileDeletion
+
+
+class Command(BaseCommand):
+    help = "Delete queued media files in batches, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--max-batches", type=int, default=50,
+            help="Stop after this many batches so a single run stays bounded.",
+        )
+        parser.add_argument(
+            "--max-attempts", type=int, default=5,
+            help="Give up on a file after this many failed attempts.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        max_attempts = options["max_attempts"]
+        totals = {FileDeletion.STATUS_DELETED: 0, FileDeletion.STATUS_SKIPPED: 0, "errors": 0}
+
+        for _ in range(options["max_batches"]):
+            batch = list(
+                FileDeletion.objects.filter(
+                    status=FileDeletion.STATUS_PENDING,
+                    next_attempt_at__lte=timezone.now(),
+                ).order_by("next_attempt_at", "id")[:batch_size]
+            )
+            if not batch:
+                break
+            self.process_batch(batch, max_attempts, totals)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {totals[FileDeletion.STATUS_DELETED]} files, skipped "
+                f"{totals[FileDeletion.STATUS_SKIPPED]} still in use, {totals['errors']} errors."
+            )
+        )
+
+    def process_batch(self, batch, max_attempts, totals):
+        now = timezone.now()
+        # Copied photos share files, so only remove paths nothing points at any more
+        referenced = referenced_media_names([row.path for row in batch])
+
+        for row in batch:
+            row.attempts += 1
+            row.processed_at = now
+            if row.path in referenced:
+                row.status = FileDeletion.STATUS_SKIPPED
+                totals[row.status] += 1
+                continue
+            try:
+                default_storage.delete(row.path)
+            except Exception as e:
+                totals["errors"] += 1
+                row.last_error = str(e)
+                if row.attempts >= max_attempts:
+                    row.status = FileDeletion.STATUS_FAILED
+                else:
+                    row.next_attempt_at = now + timedelta(minutes=2 ** row.attempts)
+                continue
+            row.status = FileDeletion.STATUS_DELETED
+            row.last_error = ""
+            totals[row.status] += 1
+
+        FileDeletion.objects.bulk_update(
+            batch, ["status", "attempts", "last_error", "next_attempt_at", "processed_at"]
+        )
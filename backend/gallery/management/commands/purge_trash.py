@@ -0,0 +1,68 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from gallery.models import Gallery, Photo
+from gallery.utils import delete_empty_galleries, delete_photos
+from subscription.utils import update_user_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Permanently delete galleries and photos that have been in the trash longer "
+        "than TRASH_RETENTION_DAYS, in small batches so no transaction holds locks for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--max-batches", type=int, default=100,
+            help="Stop after this many batches so a single run stays bounded.",
+        )
+        parser.add_argument(
+            "--days", type=float, default=None,
+            help="Purge items trashed more than this many days ago (default: TRASH_RETENTION_DAYS).",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else settings.TRASH_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        batch_size = options["batch_size"]
+        batches = 0
+        photos = galleries = 0
+
+        # Photos first: a gallery can only go once nothing is left inside it
+        expired_photos = Photo.all_objects.filter(deleted_at__lt=cutoff).order_by("id")
+        while batches < options["max_batches"]:
+            ids = list(expired_photos.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            photos += delete_photos(ids)
+            batches += 1
+
+        # Leaves first, so each batch's parents become leaves for the next
+        empty_galleries = (
+            Gallery.all_objects.filter(deleted_at__lt=cutoff)
+            .filter(
+                ~Exists(Photo.all_objects.filter(gallery=OuterRef("pk"))),
+                ~Exists(Gallery.all_objects.filter(parent_gallery=OuterRef("pk"))),
+            )
+            .order_by("id")
+        )
+        owner_ids = set()
+        while batches < options["max_batches"]:
+            ids = list(empty_galleries.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            owner_ids |= delete_empty_galleries(ids)
+            galleries += len(ids)
+            batches += 1
+
+        for user in get_user_model().objects.filter(id__in=owner_ids):
+            update_user_stats(user)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Purged {photos} photos and {galleries} galleries from the trash.")
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.db.models.functions import Length
+from gallery.models import Photo
+from gallery.utils import rebalance_photo_order
+
+# Keys grow by about one character per five drops into the same gap
+DEFAULT_MAX_KEY_LENGTH = 12
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite photo order keys as short, evenly spaced keys in galleries where "
+        "repeated reordering has made them long, or where photos were never given one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-key-length", type=int, default=DEFAULT_MAX_KEY_LENGTH)
+        parser.add_argument(
+            "--max-galleries", type=int, default=None,
+            help="Stop after this many galleries (default: all that need it).",
+        )
+
+    def handle(self, *args, **options):
+        gallery_ids = (
+            Photo.objects.annotate(key_length=Length("order_key"))
+            .filter(Q(order_key="") | Q(key_length__gt=options["max_key_length"]))
+            .order_by("gallery_id")
+            .values_list("gallery_id", flat=True)
+            .distinct()
+        )
+        if options["max_galleries"] is not None:
+            gallery_ids = gallery_ids[:options["max_galleries"]]
+
+        galleries = photos = 0
+        # Each gallery is rebalanced in its own transaction
+        for gallery_id in list(gallery_ids):
+            photos += rebalance_photo_order(gallery_id)
+            galleries += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebalanced {photos} photos in {galleries} galleries.")
+        )
@@ -0,0 +1,105 @@
+import os
+import shutil
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Value, When
+from gallery.models import Photo, sharded_photo_path
+from gallery.utils import schedule_file_deletion
+
+# Files still in the original flat gallery_photos/ directory
+LEGACY_PATH_REGEX = r"^gallery_photos/[^/]+$"
+
+
+def relocate(storage, old_name, new_name):
+    """Make `old_name`'s content available at `new_name`, returning the stored name."""
+    try:
+        src, dst = storage.path(old_name), storage.path(new_name)
+    except NotImplementedError:
+        with storage.open(old_name, "rb") as f:
+            return storage.save(new_name, f)
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    # A hard link is instant and takes no extra space; the old name is
+    # released through the deletion queue once the rows point elsewhere
+    try:
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, dst)
+    return new_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Move photos from the flat gallery_photos/ directory into the sharded "
+        "<owner>/<prefix>/ layout. Safe to stop and re-run: finished photos drop "
+        "out of the selection, and files copied for an interrupted batch are left "
+        "for cleanup_orphan_media."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--max-batches", type=int, default=None,
+            help="Stop after this many batches (default: run to completion).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only count the photos that would be moved.",
+        )
+
+    def handle(self, *args, **options):
+        photos = Photo.all_objects.filter(image__regex=LEGACY_PATH_REGEX)
+        if options["dry_run"]:
+            self.stdout.write(f"{photos.count()} photos still in the flat layout.")
+            return
+
+        moved = missing = 0
+        last_id = 0
+        batches = 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            batch = list(
+                photos.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "image", "gallery__user_id")[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            batches += 1
+
+            count, lost = self.move_batch(batch)
+            moved += count
+            missing += lost
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Moved {moved} files, {missing} missing from storage.")
+        )
+
+    def move_batch(self, batch):
+        """Copy one batch of files and repoint every row that uses them in one UPDATE."""
+        renamed = {}
+        missing = 0
+        # Copied photos share a file; the first owner seen decides its shard
+        for _, old_name, owner_id in batch:
+            if old_name in renamed:
+                continue
+            try:
+                renamed[old_name] = relocate(
+                    default_storage, old_name, sharded_photo_path(owner_id, old_name)
+                )
+            except FileNotFoundError:
+                missing += 1
+                self.stdout.write(self.style.WARNING(f"Missing file: {old_name}"))
+
+        if not renamed:
+            return 0, missing
+
+        with transaction.atomic():
+            Photo.all_objects.filter(image__in=renamed).update(
+                image=Case(*[When(image=old, then=Value(new)) for old, new in renamed.items()])
+            )
+            schedule_file_deletion(*renamed)
+        return len(renamed), missing
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0004_gallery_selection_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='file_size',
+            field=models.PositiveBigIntegerField(default=0, help_text='Size of the original image in bytes, recorded at upload'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0005_photo_file_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(help_text='Storage name relative to MEDIA_ROOT', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('deleted', 'Deleted'), ('skipped', 'Skipped (still referenced)'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='gallery_fil_status_cc899d_idx')],
+            },
+        ),
+    ]
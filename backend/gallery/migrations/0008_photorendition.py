@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0007_photo_dimensions_placeholder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('avif', 'AVIF')], max_length=10)),
+                ('file', models.ImageField(upload_to='renditions/')),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('photo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='gallery.photo')),
+            ],
+            options={
+                'unique_together': {('photo', 'format')},
+            },
+        ),
+    ]
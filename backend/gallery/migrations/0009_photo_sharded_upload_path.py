@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:47
+
+import gallery.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0008_photorendition'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photo',
+            name='image',
+            field=models.ImageField(upload_to=gallery.models.photo_upload_path),
+        ),
+    ]
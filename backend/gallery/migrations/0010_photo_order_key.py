@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0009_photo_sharded_upload_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='photo',
+            options={'ordering': ['order_key', 'id']},
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='order_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['gallery', 'order_key'], name='gallery_pho_gallery_e2c7e6_idx'),
+        ),
+    ]
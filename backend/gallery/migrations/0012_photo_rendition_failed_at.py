@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gallery', '0011_trash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='rendition_failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,132 @@
+import os
+import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 
 User = settings.AUTH_USER_MODEL
 
+
+def sharded_photo_path(owner_id, filename):
+    """
+    gallery_photos/<owner id>/<ab>/<random hex>.<ext>
+
+    Sharding by owner and a two-character prefix keeps every directory small,
+    and the random name means storage never has to probe for a free one.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    token = uuid.uuid4().hex
+    return f"gallery_photos/{owner_id or 'unowned'}/{token[:2]}/{token}{ext}"
+
+
+def photo_upload_path(instance, filename):
+    """upload_to for Photo.image, sharded under the gallery owner."""
+    return sharded_photo_path(instance.gallery.user_id, filename)
+
+
+# Photo order keys are base-36 fractions compared as plain strings, so a photo
+# dropped between two others gets a key between theirs and no other row changes
+ORDER_KEY_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+ORDER_KEY_MAX_LENGTH = 64
+
+
+def order_key_between(lower, upper):
+    """
+    A key sorting strictly between `lower` and `upper`. None (or "" for
+    `lower`) is an open end. Keys never end in "0", so there is always room.
+    """
+    lower = lower or ""
+    if upper is not None and upper <= lower:
+        raise ValueError(f"No order key between {lower!r} and {upper!r}.")
+    digits = ORDER_KEY_DIGITS
+
+    if upper is None:
+        # Appending counts up at the key's own width, and doubles the width
+        # once it runs out, so a long run of uploads keeps keys short
+        for i in range(len(lower) - 1, -1, -1):
+            if lower[i] != digits[-1]:
+                return lower[:i] + digits[digits.index(lower[i]) + 1] + digits[1] * (len(lower) - i - 1)
+        return lower + digits[1] * max(len(lower), 1)
+
+    if not lower:
+        return order_key_below(upper)
+
+    # Keep the shared prefix and split the first digit that differs
+    n = 0
+    while n < len(upper) and (lower[n] if n < len(lower) else digits[0]) == upper[n]:
+        n += 1
+    low = digits.index(lower[n]) if n < len(lower) else 0
+    high = digits.index(upper[n])
+    if high - low > 1:
+        return upper[:n] + digits[(low + high) // 2]
+    if len(upper) > n + 1:
+        return upper[:n + 1]
+    # Adjacent digits: anything above the rest of `lower` fits, so take the middle of that range
+    return upper[:n] + digits[low] + order_key_above(lower[n + 1:])
+
+
+def order_key_above(lower):
+    """A key above `lower` halfway to the top of the key space, at the first digit with room."""
+    digits = ORDER_KEY_DIGITS
+    for i, digit in enumerate(lower):
+        index = digits.index(digit)
+        if index < len(digits) - 1:
+            return lower[:i] + digits[(index + len(digits)) // 2]
+    return lower + digits[len(digits) // 2]
+
+
+def order_key_below(upper):
+    """
+    A key below `upper` (and above ""). Prepending counts down at the key's
+    own width and doubles the width once it runs out, the way appending
+    counts up, so moving photo after photo to the front keeps keys short.
+    """
+    digits, base = ORDER_KEY_DIGITS, len(ORDER_KEY_DIGITS)
+    value = 0
+    for digit in upper:
+        value = value * base + digits.index(digit)
+    value -= 1
+    # Skip values that would end in "0"
+    while value > 0 and value % base == 0:
+        value -= 1
+    if value <= 0:
+        # Only "0...01" was left at this width
+        return digits[0] * len(upper) + digits[-1] * len(upper)
+    key = ""
+    for _ in range(len(upper)):
+        value, digit = divmod(value, base)
+        key = digits[digit] + key
+    return key
+
+
+def spaced_order_keys(count):
+    """
+    `count` ascending keys of equal length spread over the lower half of the
+    key space, leaving room between them and for appends after the last.
+    """
+    base = len(ORDER_KEY_DIGITS)
+    width = 2
+    while base ** width < count * 8:
+        width += 1
+    step = base ** width // (count * 2)
+    keys = []
+    for i in range(1, count + 1):
+        value, key = i * step, ""
+        for _ in range(width):
+            value, digit = divmod(value, base)
+            key = ORDER_KEY_DIGITS[digit] + key
+        keys.append(key.rstrip(ORDER_KEY_DIGITS[0]))
+    return keys
+
+
+class TrashableManager(models.Manager):
+    """Default manager that hides rows moved to the trash (deleted_at set)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Gallery(models.Model):
     VISIBILITY_CHOICES = [
         ('private', 'Private'),
@@ -57,6 +180,13 @@ class Gallery(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Set when moved to the trash; purge_trash deletes it for good later
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    objects = TrashableManager()
+    # Includes galleries in the trash
+    all_objects = models.Manager()
+
     def save(self, *args, **kwargs):
         # Generate share token if sharing is enabled and token doesn't exist
         if self.is_shareable_via_link and not self.share_token:
@@ -134,8 +264,23 @@ class Photo(models.Model):
         settings.AUTH_USER_MODEL, related_name='accessible_photos', blank=True
     )
     defaults = models.JSONField(default=dict, blank=True, null=True)
-    image = models.ImageField(upload_to='gallery_photos/')
+    image = models.ImageField(upload_to=photo_upload_path)
+    file_size = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Size of the original image in bytes, recorded at upload"
+    )
     caption = models.CharField(max_length=255, blank=True, null=True)
+
+    # Filled in by rendition generation so clients can lay out grids up front
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    placeholder = models.TextField(
+        blank=True,
+        default='',
+        help_text="Tiny base64 JPEG data URI shown while the image loads"
+    )
+    # Set when the image could not be decoded, so generate_renditions stops retrying it
+    rendition_failed_at = models.DateTimeField(blank=True, null=True)
     
     # Separate visibility and sharing controls
     visibility = models.CharField(
@@ -158,6 +303,25 @@ class Photo(models.Model):
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Position within the gallery, see order_key_between. Rows from before
+    # ordering existed keep "" and fall back to id order until rebalanced.
+    order_key = models.CharField(
+        max_length=ORDER_KEY_MAX_LENGTH, blank=True, default=''
+    )
+
+    # Set when moved to the trash; purge_trash deletes it for good later
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    objects = TrashableManager()
+    # Includes photos in the trash
+    all_objects = models.Manager()
+
+    class Meta:
+        ordering = ['order_key', 'id']
+        indexes = [
+            models.Index(fields=['gallery', 'order_key']),
+        ]
+
     def save(self, *args, **kwargs):
         # Generate share token if sharing is enabled and token doesn't exist
         if self.is_shareable_via_link and not self.share_token:
@@ -165,9 +329,28 @@ class Photo(models.Model):
         # Clear share token if sharing is disabled
         elif not self.is_shareable_via_link:
             self.share_token = None
+
+        # Record the upload size once so storage accounting never stats the file
+        if self._state.adding and self.image and not self.file_size:
+            self.file_size = self.image.size
+
+        # New photos go to the end of their gallery
+        if self._state.adding and not self.order_key:
+            self.order_key = Photo.next_order_key(self.gallery_id)
         
         super().save(*args, **kwargs)
 
+    @classmethod
+    def next_order_key(cls, gallery_id):
+        """Key placing a photo after the last one in the gallery."""
+        last = (
+            cls.objects.filter(gallery_id=gallery_id)
+            .order_by('-order_key')
+            .values_list('order_key', flat=True)
+            .first()
+        )
+        return order_key_between(last, None)
+
     @property
     def is_public(self):
         """Helper property for backward compatibility and clarity."""
@@ -207,6 +390,40 @@ class Photo(models.Model):
         return f"Photo in {self.gallery.title}"
 
 
+class PhotoRendition(models.Model):
+    """
+    Downscaled copy of a photo in a modern format (WebP/AVIF), served in
+    place of the original when the client's Accept header allows it.
+    """
+    FORMAT_WEBP = "webp"
+    FORMAT_AVIF = "avif"
+
+    FORMAT_CHOICES = [
+        (FORMAT_WEBP, "WebP"),
+        (FORMAT_AVIF, "AVIF"),
+    ]
+
+    photo = models.ForeignKey(
+        Photo, on_delete=models.CASCADE, related_name='renditions'
+    )
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    file = models.ImageField(upload_to='renditions/')
+    file_size = models.PositiveBigIntegerField(default=0)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [['photo', 'format']]
+
+    @property
+    def content_type(self):
+        return f"image/{self.format}"
+
+    def __str__(self):
+        return f"{self.get_format_display()} rendition of photo {self.photo_id}"
+
+
 class PublicGallery(models.Model):
     """Manager for public galleries - this could be a separate view/manager instead"""
     gallery = models.OneToOneField(
@@ -264,6 +481,41 @@ class SharedAccess(models.Model):
 
 
 
+class FileDeletion(models.Model):
+    """
+    Queue and audit trail for media files whose rows were deleted.
+    Rows are enqueued after the deleting transaction commits and are
+    processed in batches by the `process_file_deletions` command.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_DELETED = "deleted"
+    STATUS_SKIPPED = "skipped"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_DELETED, "Deleted"),
+        (STATUS_SKIPPED, "Skipped (still referenced)"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    path = models.CharField(max_length=255, help_text="Storage name relative to MEDIA_ROOT")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.path} ({self.status})"
+
+
 # preferences/models.py
 
 from django.db import models
@@ -1,9 +1,19 @@
+from datetime import timedelta
 from rest_framework import serializers
 from .models import Gallery, Photo, PublicGallery, SharedAccess
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.http import urlencode
 from studio.models import Studio
+from subscription.utils import transfer_storage_used, adjust_storage_used
+from .utils import generate_renditions, schedule_file_deletion, check_image_pixels, ImageTooLarge
+from .utils import gallery_subtree_ids, photo_totals_by_gallery, move_photo_after, set_share_links
+from .utils import cascade_gallery_settings, restore_gallery
+from subscription.utils import update_user_stats
 
 User = get_user_model()
 
@@ -29,27 +39,144 @@ class UserSimpleSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "email"]
 
 
-class PhotoSerializer(serializers.ModelSerializer):
+class SparseFields:
+    """
+    The output shape requested with `?fields=` and `?expand=`.
+
+    `fields` keeps only the named fields. `expand` names the nested relations
+    (Meta.expandable_fields) to include; any not named are dropped. Dotted
+    names such as "photos.id" or "photos.assigned_clients" shape that nested
+    serializer.
+    """
+
+    def __init__(self, fields=None, expand=()):
+        self.fields = set(fields) if fields is not None else None
+        self.expand = set(expand)
+
+    @classmethod
+    def from_query_params(cls, params):
+        """None when neither parameter is present, meaning the full shape."""
+        if "fields" not in params and "expand" not in params:
+            return None
+
+        def split(value):
+            return [name.strip() for name in value.split(",") if name.strip()]
+
+        fields = split(params["fields"]) if "fields" in params else None
+        return cls(fields, split(params.get("expand", "")))
+
+    def includes(self, name, expandable=False):
+        """Whether the field `name` is part of the requested shape."""
+        requested = {f.split(".", 1)[0] for f in self.fields or ()}
+        if expandable:
+            return name in requested or name in {e.split(".", 1)[0] for e in self.expand}
+        return self.fields is None or name in requested
+
+    def nested(self, name):
+        """The shape requested for the nested relation `name`."""
+        prefix = name + "."
+        fields = {f[len(prefix):] for f in self.fields or () if f.startswith(prefix)}
+        expand = {e[len(prefix):] for e in self.expand if e.startswith(prefix)}
+        return SparseFields(fields or None, expand)
+
+
+def wants(sparse, name, expandable=False):
+    """`sparse.includes` that treats a missing shape as "everything"."""
+    return sparse is None or sparse.includes(name, expandable)
+
+
+class SparseFieldsMixin:
+    """
+    Accepts `sparse=SparseFields(...)` and drops every unrequested field,
+    nested relations included, before anything is serialized.
+    """
+
+    def __init__(self, *args, sparse=None, **kwargs):
+        self.sparse = sparse
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.sparse is None:
+            return fields
+        expandable = getattr(self.Meta, "expandable_fields", ())
+        for name in list(fields):
+            if not self.sparse.includes(name, name in expandable):
+                del fields[name]
+                continue
+            nested = getattr(fields[name], "child", fields[name])
+            if isinstance(nested, SparseFieldsMixin):
+                nested.sparse = self.sparse.nested(name)
+        return fields
+
+
+def has_member(obj, relation, user):
+    """Membership test that reuses prefetched rows when the view loaded them."""
+    if relation in getattr(obj, "_prefetched_objects_cache", {}):
+        return any(member.id == user.id for member in getattr(obj, relation).all())
+    return getattr(obj, relation).filter(id=user.id).exists()
+
+
+def gallery_slug(serializer, gallery):
+    """Owner slug for `gallery`, from the view's bulk lookup when it made one."""
+    slugs = serializer.context.get("owner_slugs")
+    if slugs is not None and gallery.user_id in slugs:
+        return slugs[gallery.user_id]
+    user = gallery.user
+    try:
+        studio = Studio.objects.get(photographer=user)
+        if studio.slug:
+            return studio.slug
+    except Studio.DoesNotExist:
+        pass
+    return user.username
+
+
+def gallery_photo_count(serializer, gallery):
+    """Photos in `gallery` and its sub-galleries, from the view's bulk totals when present."""
+    totals = serializer.context.get("gallery_photo_totals")
+    if totals is not None and gallery.id in totals:
+        return totals[gallery.id]
+    return photo_totals_by_gallery(
+        [gallery.user_id], gallery_ids=gallery_subtree_ids(gallery)
+    ).get(gallery.id, 0)
+
+
+class PhotoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     assigned_clients = UserSimpleSerializer(many=True, read_only=True)
     accessible_users = UserSimpleSerializer(many=True, read_only=True)
     share_url = serializers.ReadOnlyField()
     can_share = serializers.SerializerMethodField()
     access_type = serializers.SerializerMethodField()
+    display_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Photo
         fields = [
             "id", "image", "caption", "uploaded_at", "assigned_clients", 
             "accessible_users", "visibility", "is_shareable_via_link", 
-            "share_url", "is_public", "can_share", "access_type"
+            "share_url", "is_public", "can_share", "access_type",
+            "width", "height", "placeholder", "display_url", "order_key"
         ]
+        read_only_fields = ["order_key"]
+        expandable_fields = ["assigned_clients", "accessible_users"]
+
+    def get_display_url(self, obj):
+        """URL that serves a WebP/AVIF rendition when the browser supports one."""
+        from django.urls import reverse
+        url = reverse('photo-image', kwargs={'pk': obj.pk})
+        # Viewers arriving through a share link carry its token to the image view
+        if self.context.get('share_token'):
+            url += '?' + urlencode({'token': self.context['share_token']})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
     def get_can_share(self, obj):
         """Check if current user can modify sharing settings."""
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        return request.user == obj.gallery.user
+        return request.user.id == obj.gallery.user_id
 
     def get_access_type(self, obj):
         """Determine how the current user has access to this photo."""
@@ -58,11 +185,11 @@ class PhotoSerializer(serializers.ModelSerializer):
             return 'public' if obj.is_public else 'anonymous'
         
         user = request.user
-        if user == obj.gallery.user:
+        if user.id == obj.gallery.user_id:
             return 'owner'
-        elif obj.assigned_clients.filter(id=user.id).exists():
+        elif has_member(obj, 'assigned_clients', user):
             return 'assigned'
-        elif obj.accessible_users.filter(id=user.id).exists():
+        elif has_member(obj, 'accessible_users', user):
             return 'shared'
         elif obj.is_public:
             return 'public'
@@ -76,9 +203,36 @@ class PhotoCreateSerializer(serializers.ModelSerializer):
         model = Photo
         fields = ["image", "caption", "visibility", "is_shareable_via_link"]
 
+    def validate_image(self, value):
+        """Reject oversized images using the size ImageField already read from the header."""
+        try:
+            check_image_pixels(*value.image.size)
+        except ImageTooLarge as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
     def create(self, validated_data):
         """Create photo instance"""
-        return Photo.objects.create(**validated_data)
+        photo = Photo.objects.create(**validated_data)
+        # Placeholder only; WebP/AVIF encoding is left to the generate_renditions job
+        generate_renditions(photo, formats=())
+        return photo
+
+    def update(self, instance, validated_data):
+        """Update photo; a replaced image gets fresh renditions and storage accounting."""
+        old_name, old_size = instance.image.name, instance.file_size
+        replacing_image = 'image' in validated_data
+        if replacing_image:
+            instance.file_size = validated_data['image'].size
+
+        instance = super().update(instance, validated_data)
+
+        if replacing_image:
+            adjust_storage_used(instance.gallery.user_id, instance.file_size - old_size)
+            schedule_file_deletion(old_name)
+            instance.renditions.all().delete()
+            generate_renditions(instance, formats=())
+        return instance
 
 
 class PhotoShareSerializer(serializers.Serializer):
@@ -94,7 +248,7 @@ class PhotoShareSerializer(serializers.Serializer):
 
 
 
-class GalleryRecursiveSerializer(serializers.ModelSerializer):
+class GalleryRecursiveSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Recursively serializes galleries with their sub-galleries and photos."""
     photos = PhotoSerializer(many=True, read_only=True)
     sub_galleries = serializers.SerializerMethodField()
@@ -102,6 +256,7 @@ class GalleryRecursiveSerializer(serializers.ModelSerializer):
     accessible_users = UserSimpleSerializer(many=True, read_only=True)
     share_url = serializers.ReadOnlyField()
     slug = serializers.SerializerMethodField()
+    photo_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Gallery
@@ -118,31 +273,34 @@ class GalleryRecursiveSerializer(serializers.ModelSerializer):
             "is_shareable_via_link",
             "share_url",
             "is_public",
-            "slug"
+            "slug",
+            "photo_count"
         ]
+        expandable_fields = ["photos", "sub_galleries", "assigned_clients", "accessible_users"]
 
     def get_sub_galleries(self, obj):
+        """Sub-galleries share the parent's requested shape at every level."""
+        children = self.context.get("gallery_children")
+        sub_galleries = children.get(obj.id, []) if children is not None else obj.sub_galleries.all()
         return GalleryRecursiveSerializer(
-            obj.sub_galleries.all(),
+            sub_galleries,
             many=True,
-            context=self.context
+            context=self.context,
+            sparse=self.sparse
         ).data
 
     def get_slug(self, obj):
         """Return the slug for the gallery owner: use Studio slug if photographer, else username."""
-        user = obj.user
-        try:
-            studio = Studio.objects.get(photographer=user)
-            if studio.slug:
-                return studio.slug
-        except Studio.DoesNotExist:
-            pass
-        return user.username
+        return gallery_slug(self, obj)
+
+    def get_photo_count(self, obj):
+        """Total number of photos in gallery and sub-galleries."""
+        return gallery_photo_count(self, obj)
 
 
 
 
-class GallerySerializer(serializers.ModelSerializer):
+class GallerySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     photos = PhotoSerializer(many=True, read_only=True)
     sub_galleries = serializers.SerializerMethodField()
     assigned_clients = UserSimpleSerializer(many=True, read_only=True)
@@ -178,12 +336,14 @@ class GallerySerializer(serializers.ModelSerializer):
             "photo_count",
             "is_featured"
         ]
+        expandable_fields = ["photos", "sub_galleries", "assigned_clients", "accessible_users"]
 
     def get_sub_galleries(self, obj):
         return GalleryRecursiveSerializer(
             obj.sub_galleries.all(),
             many=True,
-            context=self.context
+            context=self.context,
+            sparse=self.sparse
         ).data
 
     def get_cover_image(self, obj):
@@ -203,11 +363,11 @@ class GallerySerializer(serializers.ModelSerializer):
             return 'public' if obj.is_public else 'anonymous'
         
         user = request.user
-        if user == obj.user:
+        if user.id == obj.user_id:
             return 'owner'
-        elif obj.assigned_clients.filter(id=user.id).exists():
+        elif has_member(obj, 'assigned_clients', user):
             return 'assigned'
-        elif obj.accessible_users.filter(id=user.id).exists():
+        elif has_member(obj, 'accessible_users', user):
             return 'shared'
         elif obj.is_public:
             return 'public'
@@ -215,12 +375,7 @@ class GallerySerializer(serializers.ModelSerializer):
 
     def get_photo_count(self, obj):
         """Total number of photos in gallery and sub-galleries."""
-        def count_photos(gallery):
-            count = gallery.photos.count()
-            for sub_gallery in gallery.sub_galleries.all():
-                count += count_photos(sub_gallery)
-            return count
-        return count_photos(obj)
+        return gallery_photo_count(self, obj)
 
     def get_is_featured(self, obj):
         """Check if gallery is featured in public listings."""
@@ -230,14 +385,7 @@ class GallerySerializer(serializers.ModelSerializer):
 
     def get_slug(self, obj):
         """Return the slug for the gallery owner: use Studio slug if photographer, else username."""
-        user = obj.user
-        try:
-            studio = Studio.objects.get(photographer=user)
-            if studio.slug:
-                return studio.slug
-        except Studio.DoesNotExist:
-            pass
-        return user.username
+        return gallery_slug(self, obj)
 
 
 
@@ -252,8 +400,19 @@ class GalleryShareSerializer(serializers.Serializer):
     """Serializer for updating gallery sharing settings."""
     visibility = serializers.ChoiceField(choices=Gallery.VISIBILITY_CHOICES)
     is_shareable_via_link = serializers.BooleanField()
+    cascade = serializers.BooleanField(
+        default=False, help_text="Apply to all sub-galleries and their photos too."
+    )
     
     def update(self, instance, validated_data):
+        if validated_data.get('cascade'):
+            self.cascaded = cascade_gallery_settings(
+                instance,
+                visibility=validated_data.get('visibility'),
+                is_shareable_via_link=validated_data.get('is_shareable_via_link')
+            )
+            return instance
+
         instance.visibility = validated_data['visibility']
         instance.is_shareable_via_link = validated_data['is_shareable_via_link']
         instance.save()
@@ -317,6 +476,10 @@ class AddToGallerySerializer(serializers.Serializer):
                         new_photo = Photo(
                             gallery=shared_gallery,
                             image=photo.image,
+                            file_size=photo.file_size,
+                            width=photo.width,
+                            height=photo.height,
+                            placeholder=photo.placeholder,
                             caption=photo.caption,
                             visibility=photo.visibility,
                             is_shareable_via_link=photo.is_shareable_via_link
@@ -373,6 +536,10 @@ class AddToGallerySerializer(serializers.Serializer):
                 new_photo = Photo(
                     gallery=shared_gallery,
                     image=original_photo.image,
+                    file_size=original_photo.file_size,
+                    width=original_photo.width,
+                    height=original_photo.height,
+                    placeholder=original_photo.placeholder,
                     caption=original_photo.caption,
                     visibility=original_photo.visibility,
                     is_shareable_via_link=original_photo.is_shareable_via_link
@@ -449,10 +616,17 @@ class GalleryListSerializer(serializers.ModelSerializer):
             "is_shareable_via_link", "is_public", "access_type", "slug"
         ]
     
+    # The cover, count and access fields read annotations when the view
+    # supplies them (see UserGalleriesView) and query per gallery otherwise
+
     def get_cover_image(self, obj):
+        if hasattr(obj, 'cover_image_name'):
+            return default_storage.url(obj.cover_image_name) if obj.cover_image_name else None
         return obj.cover_photo
     
     def get_photo_count(self, obj):
+        if hasattr(obj, 'photo_count'):
+            return obj.photo_count
         return obj.photos.count()
     
     def get_access_type(self, obj):
@@ -461,26 +635,24 @@ class GalleryListSerializer(serializers.ModelSerializer):
             return 'public' if obj.is_public else 'anonymous'
         
         user = request.user
-        if user == obj.user:
+        if user.id == obj.user_id:
             return 'owner'
-        elif obj.assigned_clients.filter(id=user.id).exists():
+        elif self._is_member(obj, 'is_assigned', 'assigned_clients', user):
             return 'assigned'
-        elif obj.accessible_users.filter(id=user.id).exists():
+        elif self._is_member(obj, 'is_shared', 'accessible_users', user):
             return 'shared'
         elif obj.is_public:
             return 'public'
         return 'no_access'
 
+    def _is_member(self, obj, flag, relation, user):
+        if hasattr(obj, flag):
+            return getattr(obj, flag)
+        return has_member(obj, relation, user)
+
     def get_slug(self, obj):
         """Return the slug for the gallery owner: use Studio slug if photographer, else username."""
-        user = obj.user
-        try:
-            studio = Studio.objects.get(photographer=user)
-            if studio.slug:
-                return studio.slug
-        except Studio.DoesNotExist:
-            pass
-        return user.username
+        return gallery_slug(self, obj)
 
 
 class UserGalleriesSerializer(serializers.Serializer):
@@ -495,8 +667,21 @@ class UserGalleriesSerializer(serializers.Serializer):
 class GalleryVisibilitySerializer(serializers.Serializer):
     """Simple serializer for just updating visibility without sharing settings."""
     visibility = serializers.ChoiceField(choices=Gallery.VISIBILITY_CHOICES)
+    cascade = serializers.BooleanField(
+        default=False, help_text="Apply to all sub-galleries and their photos too."
+    )
+
+    def validate(self, data):
+        # The view validates with partial=True, which lets a missing visibility through
+        if 'visibility' not in data:
+            raise serializers.ValidationError({'visibility': ["This field is required."]})
+        return data
     
     def update(self, instance, validated_data):
+        if validated_data.get('cascade'):
+            self.cascaded = cascade_gallery_settings(instance, visibility=validated_data['visibility'])
+            return instance
+
         instance.visibility = validated_data['visibility']
         instance.save()
         
@@ -522,8 +707,28 @@ class PhotoVisibilitySerializer(serializers.Serializer):
 class ShareLinkToggleSerializer(serializers.Serializer):
     """Serializer for toggling share link functionality only."""
     is_shareable_via_link = serializers.BooleanField()
+    cascade = serializers.BooleanField(
+        default=False, help_text="Galleries only: apply to all sub-galleries and their photos too."
+    )
+
+    def validate_cascade(self, value):
+        if value and not isinstance(self.instance, Gallery):
+            raise serializers.ValidationError("Only gallery settings can cascade.")
+        return value
+
+    def validate(self, data):
+        # The views validate with partial=True, which lets a missing value through
+        if 'is_shareable_via_link' not in data:
+            raise serializers.ValidationError({'is_shareable_via_link': ["This field is required."]})
+        return data
     
     def update(self, instance, validated_data):
+        if validated_data.get('cascade'):
+            self.cascaded = cascade_gallery_settings(
+                instance, is_shareable_via_link=validated_data['is_shareable_via_link']
+            )
+            return instance
+
         instance.is_shareable_via_link = validated_data['is_shareable_via_link']
         instance.save()
         return instance
@@ -564,13 +769,208 @@ class MovePhotoSerializer(serializers.Serializer):
         photo = self.validated_data['photo']
         target_gallery = self.validated_data['target_gallery']
 
-        # Move the photo into the target gallery
+        # Move the photo into the target gallery, after its last photo
+        source_owner_id = photo.gallery.user_id
         photo.gallery = target_gallery
+        photo.order_key = Photo.next_order_key(target_gallery.id)
         photo.save()
+
+        # Storage follows the photo (and its renditions) into another user's gallery
+        if source_owner_id != target_gallery.user_id:
+            rendition_bytes = photo.renditions.aggregate(total=Sum('file_size'))['total'] or 0
+            transfer_storage_used(source_owner_id, target_gallery.user_id, photo.file_size + rendition_bytes)
         return photo
 
 
 
+class PhotoOrderMoveSerializer(serializers.Serializer):
+    photo = serializers.IntegerField()
+    after = serializers.IntegerField(allow_null=True)
+
+
+class PhotoReorderSerializer(serializers.Serializer):
+    """
+    Reorders photos of the gallery in context. Moves apply in order, each
+    putting `photo` right after `after` (null: first), so dragging a
+    selection is one move per photo, each after the previous one.
+    """
+    MAX_MOVES = 500
+
+    moves = PhotoOrderMoveSerializer(many=True, allow_empty=False)
+
+    def validate_moves(self, moves):
+        if len(moves) > self.MAX_MOVES:
+            raise serializers.ValidationError(f"At most {self.MAX_MOVES} moves per request.")
+        if any(move['photo'] == move['after'] for move in moves):
+            raise serializers.ValidationError("A photo cannot be placed after itself.")
+
+        gallery = self.context['gallery']
+        ids = {move['photo'] for move in moves}
+        ids |= {move['after'] for move in moves if move['after'] is not None}
+        missing = ids - set(gallery.photos.filter(id__in=ids).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                f"Photos not in this gallery: {', '.join(map(str, sorted(missing)))}."
+            )
+        return moves
+
+    def save(self, **kwargs):
+        """Apply the moves and return {photo id: new order key}."""
+        gallery = self.context['gallery']
+        order_keys = {}
+        with transaction.atomic():
+            # One reorder per gallery at a time, so neighbours can't change underneath
+            list(Gallery.objects.select_for_update().filter(pk=gallery.pk).values_list('id'))
+            for move in self.validated_data['moves']:
+                order_keys[move['photo']] = move_photo_after(gallery.pk, move['photo'], move['after'])
+        return order_keys
+
+
+class PhotoBatchSerializer(serializers.Serializer):
+    """
+    One operation applied to many of the requesting user's photos: ownership
+    is checked in one query and the change made in one statement.
+    """
+    MAX_PHOTOS = 1000
+    # Field each operation takes its new value from
+    OPERATION_FIELDS = {
+        'delete': None,
+        'visibility': 'visibility',
+        'caption': 'caption',
+        'share_link': 'is_shareable_via_link',
+    }
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=MAX_PHOTOS
+    )
+    operation = serializers.ChoiceField(choices=list(OPERATION_FIELDS))
+    visibility = serializers.ChoiceField(choices=Photo.VISIBILITY_CHOICES, required=False)
+    caption = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    is_shareable_via_link = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        field = self.OPERATION_FIELDS[data['operation']]
+        if field and field not in data:
+            raise serializers.ValidationError({field: f"Required for the {data['operation']} operation."})
+
+        user = self.context['request'].user
+        ids = set(data['ids'])
+        owned = set(
+            Photo.objects.filter(id__in=ids, gallery__user=user).values_list('id', flat=True)
+        )
+        if ids - owned:
+            raise serializers.ValidationError({
+                'ids': f"Photos not found in your galleries: {', '.join(map(str, sorted(ids - owned)))}."
+            })
+        data['ids'] = sorted(ids)
+        return data
+
+    def save(self, **kwargs):
+        """Apply the operation and return the number of photos changed."""
+        operation = self.validated_data['operation']
+        ids = self.validated_data['ids']
+        photos = Photo.objects.filter(id__in=ids)
+
+        if operation == 'delete':
+            # Deleting moves photos to the trash; purge_trash removes them later
+            count = photos.update(deleted_at=timezone.now())
+            update_user_stats(self.context['request'].user)
+        elif operation == 'share_link':
+            count = set_share_links(photos, self.validated_data['is_shareable_via_link'])
+        else:
+            count = photos.update(**{operation: self.validated_data[operation]})
+        return count
+
+
+def purge_at(obj):
+    """When purge_trash will delete a trashed gallery or photo for good."""
+    return obj.deleted_at + timedelta(days=settings.TRASH_RETENTION_DAYS)
+
+
+class TrashedGallerySerializer(serializers.ModelSerializer):
+    purge_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Gallery
+        fields = ["id", "title", "parent_gallery", "created_at", "deleted_at", "purge_at"]
+
+    def get_purge_at(self, obj):
+        return purge_at(obj)
+
+
+class TrashedPhotoSerializer(serializers.ModelSerializer):
+    purge_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Photo
+        fields = ["id", "gallery", "caption", "placeholder", "width", "height", "deleted_at", "purge_at"]
+
+    def get_purge_at(self, obj):
+        return purge_at(obj)
+
+
+class TrashRestoreSerializer(serializers.Serializer):
+    """Restores the requesting user's trashed galleries and photos."""
+    galleries = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    photos = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        if not data['galleries'] and not data['photos']:
+            raise serializers.ValidationError("Nothing to restore.")
+        user = self.context['request'].user
+
+        galleries = list(
+            Gallery.all_objects.filter(id__in=data['galleries'], user=user, deleted_at__isnull=False)
+            .select_related('parent_gallery')
+        )
+        missing = set(data['galleries']) - {gallery.id for gallery in galleries}
+        if missing:
+            raise serializers.ValidationError({
+                'galleries': f"Not in your trash: {', '.join(map(str, sorted(missing)))}."
+            })
+        requested = {gallery.id for gallery in galleries}
+        for gallery in galleries:
+            parent = gallery.parent_gallery
+            if parent and parent.deleted_at and parent.id not in requested:
+                raise serializers.ValidationError({
+                    'galleries': f"Restore gallery {parent.id} before its sub-gallery {gallery.id}."
+                })
+
+        photos = Photo.all_objects.filter(
+            id__in=data['photos'], gallery__user=user, deleted_at__isnull=False
+        )
+        found = dict(photos.values_list('id', 'gallery_id'))
+        missing = set(data['photos']) - set(found)
+        if missing:
+            raise serializers.ValidationError({
+                'photos': f"Not in your trash: {', '.join(map(str, sorted(missing)))}."
+            })
+        trashed_galleries = set(
+            Gallery.all_objects.filter(id__in=set(found.values()), deleted_at__isnull=False)
+            .values_list('id', flat=True)
+        ) - requested
+        if trashed_galleries:
+            raise serializers.ValidationError({
+                'photos': f"Restore gallery {min(trashed_galleries)} before its photos."
+            })
+
+        data['galleries'] = galleries
+        return data
+
+    def save(self, **kwargs):
+        """Restore everything requested and return the counts."""
+        galleries = self.validated_data['galleries']
+        with transaction.atomic():
+            # Each restore only touches rows trashed together with that gallery,
+            # so the order of nested galleries does not matter
+            for gallery in galleries:
+                restore_gallery(gallery)
+            photos = Photo.all_objects.filter(id__in=self.validated_data['photos'], deleted_at__isnull=False)
+            restored_photos = photos.update(deleted_at=None)
+        update_user_stats(self.context['request'].user)
+        return {"galleries": len(galleries), "photos": restored_photos}
+
+
 class EnableSelectionModeSerializer(serializers.Serializer):
     gallery_id = serializers.IntegerField()
 
@@ -641,7 +1041,7 @@ class PublicPhotoSerializer(serializers.ModelSerializer):
 class PublicPhotoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Photo
-        fields = ['id', 'image', 'caption']
+        fields = ['id', 'image', 'caption', 'width', 'height', 'placeholder']
 
 
 class PublicSubGallerySerializer(serializers.ModelSerializer):
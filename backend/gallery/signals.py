@@ -0,0 +1,54 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Photo, PhotoRendition
+from subscription.utils import (
+    adjust_storage_used, adjust_gallery_owner_storage_used, adjust_photo_owner_storage_used
+)
+from .utils import schedule_file_deletion
+
+
+@receiver(post_save, sender=Photo)
+def add_photo_to_storage_used(sender, instance, created, **kwargs):
+    """
+    Charge the uploaded bytes to the gallery owner's storage.
+    """
+    if created and instance.file_size:
+        adjust_storage_used(instance.gallery.user_id, instance.file_size)
+
+
+@receiver(post_delete, sender=Photo)
+def remove_photo_from_storage_used(sender, instance, **kwargs):
+    """
+    Release the photo's bytes without loading the gallery or its owner.
+    """
+    if instance.file_size:
+        adjust_gallery_owner_storage_used(instance.gallery_id, -instance.file_size)
+
+
+@receiver(post_delete, sender=Photo)
+def schedule_photo_file_deletion(sender, instance, **kwargs):
+    """
+    Hand the image file to the background deletion queue after commit.
+    """
+    if instance.image:
+        schedule_file_deletion(instance.image.name, using=kwargs.get("using"))
+
+
+@receiver(post_save, sender=PhotoRendition)
+def add_rendition_to_storage_used(sender, instance, created, **kwargs):
+    """
+    Renditions count towards the photo owner's storage like the original.
+    """
+    if created and instance.file_size:
+        adjust_photo_owner_storage_used(instance.photo_id, instance.file_size)
+
+
+@receiver(post_delete, sender=PhotoRendition)
+def release_rendition(sender, instance, **kwargs):
+    """
+    Release the rendition's bytes and queue its file for deletion.
+    """
+    if instance.file_size:
+        adjust_photo_owner_storage_used(instance.photo_id, -instance.file_size)
+    if instance.file:
+        schedule_file_deletion(instance.file.name, using=kwargs.get("using"))
@@ -1,3 +1,61 @@
-from django.test import TestCase
+import math
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import User
+from .models import ORDER_KEY_DIGITS, Gallery, order_key_between
 
-# Create your tests here.
+
+class OrderKeyBetweenTests(SimpleTestCase):
+    def assert_valid(self, key, lower, upper):
+        self.assertLess(lower or "", key)
+        if upper is not None:
+            self.assertLess(key, upper)
+        self.assertFalse(key.endswith(ORDER_KEY_DIGITS[0]))
+
+    def test_moving_to_front_grows_keys_logarithmically(self):
+        key = "i"
+        for moves in range(1, 2001):
+            new_key = order_key_between(None, key)
+            self.assert_valid(new_key, None, key)
+            key = new_key
+            # Width doubles each time a width runs out, like appending
+            self.assertLessEqual(len(key), 2 * math.ceil(math.log(moves + 1, len(ORDER_KEY_DIGITS))) + 2)
+
+    def test_adjacent_digits_bisect_the_open_range(self):
+        self.assertEqual(order_key_between("1", "2"), "1i")
+
+    def test_dropping_into_the_same_gap_grows_about_one_digit_per_five(self):
+        key = "2"
+        for _ in range(40):
+            new_key = order_key_between("1", key)
+            self.assert_valid(new_key, "1", key)
+            key = new_key
+        self.assertLessEqual(len(key), 40 // 5 + 2)
+
+
+class GallerySettingsViewTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="photographer", password="pass12345", role=User.Roles.PHOTOGRAPHER)
+        self.gallery = Gallery.objects.create(user=user, title="Wedding")
+        Gallery.objects.create(user=user, title="Ceremony", parent_gallery=self.gallery)
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+
+    def test_cascade_without_visibility_is_rejected(self):
+        url = reverse("gallery-visibility", kwargs={"gallery_id": self.gallery.id})
+        response = self.api.patch(url, {"cascade": True}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("visibility", response.data)
+
+    def test_cascade_without_share_flag_is_rejected(self):
+        url = reverse("gallery-share-link", kwargs={"gallery_id": self.gallery.id})
+        response = self.api.patch(url, {"cascade": True}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("is_shareable_via_link", response.data)
+
+    def test_cascade_applies_visibility_to_sub_galleries(self):
+        url = reverse("gallery-visibility", kwargs={"gallery_id": self.gallery.id})
+        response = self.api.patch(url, {"visibility": "public", "cascade": True}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Gallery.objects.filter(visibility="public").count(), 2)
@@ -27,6 +27,11 @@ from .views import (
     MovePhotoView,
     EnableSelectionModeView,
     PublicSelectionGalleryView,
+    PhotoImageView,
+    GalleryPhotoReorderView,
+    PhotoBatchView,
+    TrashView,
+    TrashRestoreView,
 )
 
 urlpatterns = [
@@ -38,6 +43,12 @@ urlpatterns = [
     # Photos - Basic CRUD
     path('api/gallery/photos/', PhotoListCreateView.as_view(), name='photo-list-create'),
     path('api/gallery/photos/<int:pk>/', PhotoUpdateDeleteView.as_view(), name='photo-detail'),
+    path('api/gallery/photos/<int:pk>/image/', PhotoImageView.as_view(), name='photo-image'),
+    path('api/gallery/photos/batch/', PhotoBatchView.as_view(), name='photo-batch'),
+
+    # Trash
+    path('api/gallery/trash/', TrashView.as_view(), name='gallery-trash'),
+    path('api/gallery/trash/restore/', TrashRestoreView.as_view(), name='gallery-trash-restore'),
 
     # Sharing Management (Authenticated Users)
     # Combined settings (visibility + sharing)
@@ -80,6 +91,7 @@ urlpatterns = [
     path('api/gallery/preferences/', GalleryPreferenceView.as_view(), name='gallery-preferences'),
 
     path('api/gallery/photo/move/', MovePhotoView.as_view(), name='move-photo'),
+    path('api/gallery/galleries/<int:gallery_id>/reorder/', GalleryPhotoReorderView.as_view(), name='gallery-photo-reorder'),
 
     path('api/gallery/enable-selection/', EnableSelectionModeView.as_view(), name='enable-selection-mode'),
     path('gallery/public-selection/<str:token>/', PublicSelectionGalleryView.as_view(), name='public_selection_gallery'),
@@ -0,0 +1,537 @@
+import base64
+import io
+from PIL import Image, ImageOps, ExifTags, features
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from studio.models import Studio
+from subscription.utils import adjust_storage_used
+from .models import FileDeletion, Gallery, Photo, PhotoRendition, PublicGallery, SharedAccess
+from .models import ORDER_KEY_MAX_LENGTH, order_key_between, spaced_order_keys
+
+# Longest side of the inline placeholder, in pixels
+PLACEHOLDER_SIZE = 20
+
+# Longest side of the WebP/AVIF display renditions; originals are never touched
+RENDITION_MAX_SIZE = 2560
+
+# Pillow encoder options per rendition format, in order of serving preference
+RENDITION_FORMATS = {
+    PhotoRendition.FORMAT_AVIF: {"format": "AVIF", "quality": 55},
+    PhotoRendition.FORMAT_WEBP: {"format": "WEBP", "quality": 80, "method": 4},
+}
+
+
+class ImageTooLarge(ValueError):
+    """Raised when an image declares more pixels than IMAGE_MAX_PIXELS allows."""
+
+
+def check_image_pixels(width, height, max_pixels=None):
+    """Raise ImageTooLarge if a width x height image is over the pixel limit."""
+    max_pixels = max_pixels or settings.IMAGE_MAX_PIXELS
+    if width * height > max_pixels:
+        raise ImageTooLarge(
+            f"Image is {width}x{height} ({width * height // 1000000}MP); "
+            f"the limit is {max_pixels // 1000000}MP."
+        )
+
+
+def load_image(source, max_size, max_pixels=None):
+    """
+    Decode `source` for a caller that needs at most `max_size` (width, height).
+
+    The pixel limit is checked from the header before anything is decoded.
+    JPEGs are then decoded at 1/2-1/8 scale via draft mode and other formats
+    are shrunk with reduce(), so memory follows the size the caller asked for
+    rather than the upload's. Returns (image, original_size), the image being
+    EXIF-rotated and original_size the full resolution as displayed.
+    """
+    img = Image.open(source)
+    try:
+        width, height = img.size
+        check_image_pixels(width, height, max_pixels)
+        box = max_size
+        # Report dimensions as displayed, i.e. after EXIF rotation
+        if img.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+            width, height = height, width
+            box = max_size[::-1]
+        # The size that fits `box`; JPEG draft decodes straight to near it
+        scale = max(img.width / box[0], img.height / box[1], 1)
+        img.draft(None, (int(img.width / scale) or 1, int(img.height / scale) or 1))
+        img.load()
+    except Exception:
+        img.close()
+        raise
+    # Other formats arrive at full size: shrink by an integer factor first so
+    # the full buffer is released before resampling
+    factor = int(max(img.width / box[0], img.height / box[1]))
+    if factor >= 2 and img.mode not in ("1", "P", "I;16"):
+        img = img.reduce(factor)
+    ImageOps.exif_transpose(img, in_place=True)
+    img.thumbnail(max_size)
+    return img, (width, height)
+
+
+def available_rendition_formats():
+    """Rendition formats the installed Pillow can encode."""
+    return [fmt for fmt in RENDITION_FORMATS if features.check(fmt)]
+
+
+def build_placeholder(image):
+    """Return a ~20px JPEG data URI for `image` to paint while the real file loads."""
+    thumb = image.convert("RGB")
+    thumb.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    output = io.BytesIO()
+    thumb.save(output, format="JPEG", quality=50, optimize=True)
+    return "data:image/jpeg;base64," + base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def encode_rendition(image, fmt):
+    """Encode `image` as `fmt`, returning the bytes."""
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    output = io.BytesIO()
+    image.save(output, **RENDITION_FORMATS[fmt])
+    return output.getvalue()
+
+
+def render_photo(source, formats):
+    """
+    Decode `source` once and derive what is stored alongside a photo: its
+    displayed width/height, the placeholder and one encoded rendition per
+    format. Touches neither the database nor storage, so worker processes
+    can run it.
+    """
+    target = RENDITION_MAX_SIZE if formats else PLACEHOLDER_SIZE * 4
+    display, (width, height) = load_image(source, (target, target))
+    return {
+        "width": width,
+        "height": height,
+        "placeholder": build_placeholder(display),
+        "renditions": {fmt: encode_rendition(display, fmt) for fmt in formats},
+        "rendition_size": display.size,
+    }
+
+
+def generate_renditions(photo, formats=None):
+    """
+    Compute the stored width/height and placeholder for `photo`, then encode
+    one downscaled rendition per format in `formats` (all available formats
+    by default). Returns False, and records rendition_failed_at, if the
+    image could not be decoded.
+    """
+    if formats is None:
+        formats = available_rendition_formats()
+
+    try:
+        with photo.image.open("rb") as f:
+            rendered = render_photo(f, formats)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        photo.rendition_failed_at = timezone.now()
+        Photo.objects.filter(pk=photo.pk).update(rendition_failed_at=photo.rendition_failed_at)
+        return False
+
+    width, height, placeholder = rendered["width"], rendered["height"], rendered["placeholder"]
+    photo.width, photo.height, photo.placeholder = width, height, placeholder
+    photo.rendition_failed_at = None
+    Photo.objects.filter(pk=photo.pk).update(
+        width=width, height=height, placeholder=placeholder, rendition_failed_at=None
+    )
+
+    encoded = rendered["renditions"]
+    if encoded:
+        # Signals release the old files and their storage accounting
+        photo.renditions.filter(format__in=encoded).delete()
+        rendition_width, rendition_height = rendered["rendition_size"]
+        for fmt, data in encoded.items():
+            rendition = PhotoRendition(
+                photo=photo, format=fmt, file_size=len(data),
+                width=rendition_width, height=rendition_height,
+            )
+            rendition.file.save(f"photo_{photo.pk}.{fmt}", ContentFile(data), save=False)
+            rendition.save()
+    return True
+
+
+def parse_accept(header):
+    """Map each media type in an Accept header to its q-value."""
+    accepted = {}
+    for part in header.split(","):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            accepted[media_type.strip().lower()] = quality
+    return accepted
+
+
+def pick_rendition(renditions, accept_header):
+    """
+    Best rendition the client explicitly accepts, in RENDITION_FORMATS order.
+    Wildcards are ignored: browsers only list modern formats they can decode.
+    """
+    accepted = parse_accept(accept_header or "")
+    by_format = {rendition.format: rendition for rendition in renditions}
+    for fmt in RENDITION_FORMATS:
+        if fmt in by_format and accepted.get(f"image/{fmt}", 0) > 0:
+            return by_format[fmt]
+    return None
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range starts beyond the end of the file."""
+
+
+def parse_byte_range(header, size):
+    """
+    Parse a single-range "bytes=" Range header against a `size`-byte file.
+
+    Returns the inclusive (start, end) to send, or None when the header is
+    absent, malformed or asks for several ranges, in which case the whole
+    file is sent. Raises RangeNotSatisfiable when no byte of it exists.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, sep, end = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not start:
+            # Suffix range: the last `end` bytes
+            length = int(end)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def enqueue_file_deletions(paths):
+    """Insert one FileDeletion row per distinct storage path."""
+    FileDeletion.objects.bulk_create(
+        [FileDeletion(path=path) for path in dict.fromkeys(paths)],
+        batch_size=500,
+    )
+
+
+class _PendingFileDeletions:
+    """Paths collected during a transaction, flushed with one bulk insert on commit."""
+
+    def __init__(self):
+        self.paths = []
+
+    def flush(self):
+        enqueue_file_deletions(self.paths)
+
+
+def schedule_file_deletion(*paths, using=None):
+    """
+    Queue storage paths for removal once the current transaction commits.
+
+    A cascading delete fires post_delete once per row; collecting the paths
+    on the connection keeps that to a single insert after commit.
+    """
+    paths = [path for path in paths if path]
+    if not paths:
+        return
+
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        enqueue_file_deletions(paths)
+        return
+
+    pending = getattr(connection, "_pending_file_deletions", None)
+    # Rolled back or already committed batches are no longer registered
+    if pending is None or not any(func == pending.flush for _, func, _ in connection.run_on_commit):
+        pending = connection._pending_file_deletions = _PendingFileDeletions()
+        transaction.on_commit(pending.flush, using=using)
+    pending.paths.extend(paths)
+
+
+def owner_slugs(user_ids):
+    """Map each user id to its public slug: the Studio slug if set, else the username."""
+    user_ids = set(user_ids)
+    slugs = dict(get_user_model().objects.filter(id__in=user_ids).values_list("id", "username"))
+    studio_slugs = {}
+    for photographer_id, slug in (
+        Studio.objects.filter(photographer_id__in=user_ids).exclude(slug="")
+        .values_list("photographer_id", "slug")
+    ):
+        studio_slugs.setdefault(photographer_id, slug)
+    slugs.update(studio_slugs)
+    return slugs
+
+
+def photo_totals_by_gallery(user_ids, gallery_ids=None):
+    """
+    Map every gallery owned by `user_ids` to its photo count including all
+    sub-galleries, from one grouped query instead of a COUNT per gallery.
+    `gallery_ids` limits it to those galleries, which must include their
+    sub-galleries (see galleries_subtree_ids).
+    """
+    user_ids = set(user_ids)
+    owned = Q(user_id__in=user_ids)
+    if None in user_ids:
+        owned |= Q(user__isnull=True)
+    galleries = Gallery.objects.filter(owned)
+    if gallery_ids is not None:
+        galleries = galleries.filter(id__in=gallery_ids)
+    rows = list(
+        galleries
+        .annotate(direct=Count("photos", filter=Q(photos__deleted_at__isnull=True)))
+        .values_list("id", "parent_gallery_id", "direct")
+    )
+    parents = {gallery_id: parent_id for gallery_id, parent_id, _ in rows}
+    totals = dict.fromkeys(parents, 0)
+    for gallery_id, _, direct in rows:
+        # Add this gallery's photos to itself and every ancestor
+        seen = set()
+        node = gallery_id
+        while node in totals and node not in seen:
+            seen.add(node)
+            totals[node] += direct
+            node = parents[node]
+    return totals
+
+
+def append_order_keys(photos):
+    """
+    Give unsaved photos without an order_key keys after the last photo of
+    their gallery, with one query per gallery, for use before bulk_create.
+    """
+    last_keys = {}
+    for photo in photos:
+        if photo.order_key:
+            continue
+        if photo.gallery_id not in last_keys:
+            last_keys[photo.gallery_id] = (
+                Photo.objects.filter(gallery_id=photo.gallery_id)
+                .order_by("-order_key")
+                .values_list("order_key", flat=True)
+                .first()
+            )
+        photo.order_key = last_keys[photo.gallery_id] = order_key_between(
+            last_keys[photo.gallery_id], None
+        )
+
+
+def rebalance_photo_order(gallery_id, batch_size=500):
+    """
+    Rewrite every key in the gallery as short, evenly spaced keys in the
+    current order. Returns the number of photos.
+    """
+    with transaction.atomic():
+        # Hold the gallery row so concurrent reorders wait for the new keys
+        list(Gallery.objects.select_for_update().filter(pk=gallery_id).values_list("id"))
+        ids = list(
+            Photo.objects.filter(gallery_id=gallery_id)
+            .order_by("order_key", "id")
+            .values_list("id", flat=True)
+        )
+        Photo.objects.bulk_update(
+            [Photo(id=photo_id, order_key=key) for photo_id, key in zip(ids, spaced_order_keys(len(ids)))],
+            ["order_key"],
+            batch_size=batch_size,
+        )
+    return len(ids)
+
+
+def move_photo_after(gallery_id, photo_id, after_id):
+    """
+    Place a photo right after `after_id` (None: first) in its gallery by
+    rewriting only its own key. When the neighbours leave no room (keys never
+    assigned, or grown too long) the gallery is rebalanced first.
+    """
+    def key_between_neighbours():
+        lower = None
+        following = Photo.objects.filter(gallery_id=gallery_id).exclude(pk=photo_id)
+        if after_id is not None:
+            lower = Photo.objects.values_list("order_key", flat=True).get(pk=after_id)
+            following = following.filter(Q(order_key__gt=lower) | Q(order_key=lower, id__gt=after_id))
+        upper = following.order_by("order_key", "id").values_list("order_key", flat=True).first()
+        try:
+            key = order_key_between(lower, upper)
+        except ValueError:
+            return None
+        return key if len(key) <= ORDER_KEY_MAX_LENGTH else None
+
+    key = key_between_neighbours()
+    if key is None:
+        rebalance_photo_order(gallery_id)
+        key = key_between_neighbours()
+    Photo.objects.filter(pk=photo_id).update(order_key=key)
+    return key
+
+
+def issue_share_tokens(queryset, batch_size=500):
+    """Give every row in `queryset` that has no share token a fresh one, in bulk."""
+    model = queryset.model
+    ids = list(queryset.filter(share_token__isnull=True).values_list("id", flat=True))
+    model.objects.bulk_update(
+        [model(id=row_id, share_token=get_random_string(32)) for row_id in ids],
+        ["share_token"],
+        batch_size=batch_size,
+    )
+    return len(ids)
+
+
+def set_share_links(queryset, enabled):
+    """
+    Turn link sharing on or off for every gallery or photo in `queryset`,
+    with the token rules of their save(): enabling issues missing tokens,
+    disabling clears them. Returns the number of rows.
+    """
+    with transaction.atomic():
+        if not enabled:
+            return queryset.update(is_shareable_via_link=False, share_token=None)
+        issue_share_tokens(queryset)
+        return queryset.update(is_shareable_via_link=True)
+
+
+def delete_photos(photo_ids):
+    """
+    Delete photos with one DELETE per table instead of one per row.
+
+    The per-row post_delete receivers are bypassed, so their work (storage
+    accounting and queueing the files) is done here in bulk. The caller
+    refreshes the owners' stats.
+    """
+    photos = Photo.all_objects.filter(id__in=photo_ids)
+    renditions = PhotoRendition.objects.filter(photo_id__in=photo_ids)
+    with transaction.atomic():
+        rows = list(photos.values_list("gallery__user_id", "image", "file_size"))
+        rows += renditions.values_list("photo__gallery__user_id", "file", "file_size")
+
+        # Rows referencing the photos go first; none of these have receivers
+        Photo.assigned_clients.through.objects.filter(photo_id__in=photo_ids).delete()
+        Photo.accessible_users.through.objects.filter(photo_id__in=photo_ids).delete()
+        SharedAccess.objects.filter(photo_id__in=photo_ids).delete()
+        renditions._raw_delete(renditions.db)
+        deleted = photos._raw_delete(photos.db)
+
+        freed = {}
+        for owner_id, _, size in rows:
+            freed[owner_id] = freed.get(owner_id, 0) + size
+        for owner_id, size in freed.items():
+            adjust_storage_used(owner_id, -size)
+        schedule_file_deletion(*[name for _, name, _ in rows])
+    return deleted
+
+
+def gallery_subtree_ids(gallery, trashed=False):
+    """
+    Ids of `gallery` and every sub-gallery below it with the same owner, from
+    one query. `trashed` walks the galleries in the trash instead of the live ones.
+    """
+    return galleries_subtree_ids(gallery.user_id, [gallery.id], trashed=trashed)
+
+
+def galleries_subtree_ids(user_id, gallery_ids, trashed=False):
+    """Ids of the galleries in `gallery_ids` and every sub-gallery below them, from one query."""
+    galleries = Gallery.all_objects.filter(deleted_at__isnull=not trashed)
+    children = {}
+    for gallery_id, parent_id in (
+        galleries.filter(user_id=user_id, parent_gallery__isnull=False)
+        .values_list("id", "parent_gallery_id")
+    ):
+        children.setdefault(parent_id, []).append(gallery_id)
+
+    ids, seen, stack = [], set(), list(reversed(gallery_ids))
+    while stack:
+        gallery_id = stack.pop()
+        if gallery_id in seen:
+            continue
+        seen.add(gallery_id)
+        ids.append(gallery_id)
+        stack.extend(children.get(gallery_id, []))
+    return ids
+
+
+def cascade_gallery_settings(gallery, visibility=None, is_shareable_via_link=None):
+    """
+    Apply visibility and/or link sharing to `gallery`, its sub-galleries and
+    all of their photos with a few set-based statements, keeping the
+    PublicGallery listings in step. Returns {"galleries": n, "photos": n}.
+    """
+    gallery_ids = gallery_subtree_ids(gallery)
+    galleries = Gallery.objects.filter(id__in=gallery_ids)
+    photos = Photo.objects.filter(gallery_id__in=gallery_ids)
+    photo_count = 0
+    with transaction.atomic():
+        if visibility is not None:
+            galleries.update(visibility=visibility)
+            photo_count = photos.update(visibility=visibility)
+            if visibility == "public":
+                PublicGallery.objects.bulk_create(
+                    [PublicGallery(gallery_id=gallery_id) for gallery_id in gallery_ids],
+                    ignore_conflicts=True,
+                    batch_size=500,
+                )
+            else:
+                PublicGallery.objects.filter(gallery_id__in=gallery_ids).delete()
+        if is_shareable_via_link is not None:
+            set_share_links(galleries, is_shareable_via_link)
+            photo_count = set_share_links(photos, is_shareable_via_link)
+
+    gallery.refresh_from_db(fields=["visibility", "is_shareable_via_link", "share_token"])
+    return {"galleries": len(gallery_ids), "photos": photo_count}
+
+
+def trash_gallery(gallery):
+    """
+    Move a gallery, its sub-galleries and all of their photos to the trash
+    with two UPDATEs. They share one deleted_at so they are restored together.
+    """
+    deleted_at = timezone.now()
+    gallery_ids = gallery_subtree_ids(gallery)
+    with transaction.atomic():
+        Gallery.objects.filter(id__in=gallery_ids).update(deleted_at=deleted_at)
+        Photo.objects.filter(gallery_id__in=gallery_ids).update(deleted_at=deleted_at)
+    gallery.deleted_at = deleted_at
+    return gallery_ids
+
+
+def restore_gallery(gallery):
+    """Bring a trashed gallery back with everything that was trashed along with it."""
+    gallery_ids = gallery_subtree_ids(gallery, trashed=True)
+    with transaction.atomic():
+        # Items trashed on their own before the gallery stay in the trash
+        Gallery.all_objects.filter(id__in=gallery_ids, deleted_at=gallery.deleted_at).update(deleted_at=None)
+        Photo.all_objects.filter(gallery_id__in=gallery_ids, deleted_at=gallery.deleted_at).update(deleted_at=None)
+    gallery.deleted_at = None
+
+
+def delete_empty_galleries(gallery_ids):
+    """
+    Delete galleries that no longer hold photos or sub-galleries, with one
+    DELETE per table like delete_photos. Returns the owners affected.
+    """
+    galleries = Gallery.all_objects.filter(id__in=gallery_ids)
+    with transaction.atomic():
+        owner_ids = set(galleries.values_list("user_id", flat=True))
+        Gallery.assigned_clients.through.objects.filter(gallery_id__in=gallery_ids).delete()
+        Gallery.accessible_users.through.objects.filter(gallery_id__in=gallery_ids).delete()
+        SharedAccess.objects.filter(gallery_id__in=gallery_ids).delete()
+        PublicGallery.objects.filter(gallery_id__in=gallery_ids).delete()
+        galleries._raw_delete(galleries.db)
+    return owner_ids
@@ -7,15 +7,32 @@ from rest_framework.exceptions import PermissionDenied, NotFound
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils import timezone
+from django.utils.http import quote_etag
+from urllib.parse import quote
+import hashlib
+import mimetypes
 from .models import Gallery, Photo, PublicGallery, SharedAccess, GalleryPreference
+from .utils import pick_rendition, owner_slugs, photo_totals_by_gallery, galleries_subtree_ids
+from .utils import parse_byte_range, RangeNotSatisfiable
+from .utils import trash_gallery
+from subscription.utils import update_user_stats
+from .serializers import SparseFields, wants
 from .serializers import (
     GallerySerializer, PhotoSerializer, AssignClientsSerializer,
     GalleryRecursiveSerializer, GalleryCreateSerializer, GalleryShareSerializer,
     PhotoShareSerializer, AddToGallerySerializer, PublicGallerySerializer,
     GalleryListSerializer, UserGalleriesSerializer, PhotoCreateSerializer,
     GalleryVisibilitySerializer, PhotoVisibilitySerializer, ShareLinkToggleSerializer, 
-    GalleryPreferenceSerializer, EnableSelectionModeSerializer, PublicSelectionGallerySerializer
+    GalleryPreferenceSerializer, EnableSelectionModeSerializer, PublicSelectionGallerySerializer,
+    PhotoReorderSerializer, PhotoBatchSerializer,
+    TrashedGallerySerializer, TrashedPhotoSerializer, TrashRestoreSerializer
 )
 from rest_framework.pagination import PageNumberPagination
 from .serializers import MovePhotoSerializer
@@ -59,6 +76,29 @@ class MovePhotoView(generics.GenericAPIView):
 
 
 
+class GalleryPhotoReorderView(APIView):
+    """
+    Drag-and-drop reordering. Each move rewrites only the moved photo's
+    order key, however large the gallery.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, gallery_id):
+        gallery = get_object_or_404(Gallery, id=gallery_id)
+
+        if gallery.user != request.user:
+            raise PermissionDenied("Only the gallery owner can reorder its photos.")
+
+        serializer = PhotoReorderSerializer(data=request.data, context={'request': request, 'gallery': gallery})
+        serializer.is_valid(raise_exception=True)
+        order_keys = serializer.save()
+
+        return Response({
+            "detail": "Photos reordered.",
+            "order_keys": order_keys
+        })
+
+
 class GalleryPreferenceView(generics.GenericAPIView):
     serializer_class = GalleryPreferenceSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -117,6 +157,42 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         return False
 
 
+# ---- SPARSE FIELDSETS ----
+def photo_prefetches(sparse, prefix=""):
+    """prefetch_related lookups for the photo relations `sparse` will serialize."""
+    return [
+        f"{prefix}{name}" for name in ("assigned_clients", "accessible_users")
+        if wants(sparse, name, expandable=True)
+    ]
+
+
+def gallery_prefetches(sparse):
+    """prefetch_related lookups for the gallery relations `sparse` will serialize."""
+    lookups = [
+        name for name in ("assigned_clients", "accessible_users")
+        if wants(sparse, name, expandable=True)
+    ]
+    if wants(sparse, "photos", expandable=True):
+        lookups.append("photos")
+        lookups += photo_prefetches(sparse and sparse.nested("photos"), prefix="photos__")
+    return lookups
+
+
+class SparseFieldsViewMixin:
+    """Reads `?fields=` / `?expand=` on GET and hands the shape to the serializer."""
+
+    def get_sparse_fields(self):
+        if self.request.method != "GET":
+            return None
+        return SparseFields.from_query_params(self.request.query_params)
+
+    def get_serializer(self, *args, **kwargs):
+        sparse = self.get_sparse_fields()
+        if sparse is not None:
+            kwargs.setdefault("sparse", sparse)
+        return super().get_serializer(*args, **kwargs)
+
+
 # ---- CREATE ----
 from rest_framework.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
@@ -170,13 +246,16 @@ class GalleryShareView(APIView):
         serializer.is_valid(raise_exception=True)
         serializer.save()
         
-        return Response({
+        data = {
             "detail": "Gallery sharing settings updated.",
             "visibility": gallery.visibility,
             "is_shareable_via_link": gallery.is_shareable_via_link,
             "share_url": gallery.share_url,
             "is_public": gallery.is_public
-        })
+        }
+        if hasattr(serializer, 'cascaded'):
+            data["cascaded"] = serializer.cascaded
+        return Response(data)
 
 
 class PhotoShareView(APIView):
@@ -217,11 +296,14 @@ class GalleryVisibilityView(APIView):
         serializer.is_valid(raise_exception=True)
         serializer.save()
         
-        return Response({
+        data = {
             "detail": "Gallery visibility updated.",
             "visibility": gallery.visibility,
             "is_public": gallery.is_public
-        })
+        }
+        if hasattr(serializer, 'cascaded'):
+            data["cascaded"] = serializer.cascaded
+        return Response(data)
 
 
 class PhotoVisibilityView(APIView):
@@ -259,11 +341,14 @@ class GalleryShareLinkView(APIView):
         serializer.is_valid(raise_exception=True)
         serializer.save()
         
-        return Response({
+        data = {
             "detail": "Gallery link sharing updated.",
             "is_shareable_via_link": gallery.is_shareable_via_link,
             "share_url": gallery.share_url
-        })
+        }
+        if hasattr(serializer, 'cascaded'):
+            data["cascaded"] = serializer.cascaded
+        return Response(data)
 
 
 class PhotoShareLinkView(APIView):
@@ -287,6 +372,31 @@ class PhotoShareLinkView(APIView):
         })
 
 
+class PhotoBatchView(APIView):
+    """
+    Apply one operation to many photos:
+    {"ids": [...], "operation": "delete" | "visibility" | "caption" | "share_link",
+     plus "visibility", "caption" or "is_shareable_via_link" for the new value}.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = PhotoBatchSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        count = serializer.save()
+        operation = serializer.validated_data['operation']
+
+        data = {
+            "detail": f"{count} photos {'deleted' if operation == 'delete' else 'updated'}.",
+            "operation": operation,
+            "count": count
+        }
+        if operation == 'share_link':
+            photos = Photo.objects.filter(id__in=serializer.validated_data['ids'])
+            data["share_urls"] = {photo.id: photo.share_url for photo in photos.only('id', 'share_token', 'is_shareable_via_link')}
+        return Response(data)
+
+
 # ---- UPDATED: Shared Link Views ----
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -298,7 +408,7 @@ def gallery_share_view(request, token):
         if not gallery.is_shareable_via_link:
             raise NotFound("Gallery is not available for sharing.")
         
-        serializer = GallerySerializer(gallery, context={'request': request})
+        serializer = GallerySerializer(gallery, context={'request': request, 'share_token': token})
         return Response(serializer.data)
     except Gallery.DoesNotExist:
         raise NotFound("Gallery not found.")
@@ -314,7 +424,7 @@ def photo_share_view(request, token):
         if not photo.is_shareable_via_link:
             raise NotFound("Photo is not available for sharing.")
         
-        serializer = PhotoSerializer(photo, context={'request': request})
+        serializer = PhotoSerializer(photo, context={'request': request, 'share_token': token})
         return Response(serializer.data)
     except Photo.DoesNotExist:
         raise NotFound("Photo not found.")
@@ -373,7 +483,7 @@ class PublicGalleriesView(generics.ListAPIView):
     pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
-        queryset = PublicGallery.objects.select_related('gallery__user')
+        queryset = PublicGallery.objects.filter(gallery__deleted_at__isnull=True).select_related('gallery__user')
 
         
         # Filter options
@@ -454,40 +564,51 @@ class UserGalleriesView(APIView):
 
     def get(self, request):
         user = request.user
-        print("User:", user)
-        
-        # Owned galleries (if user is user)
-        owned_galleries = []
-        if user:
-            owned_galleries = Gallery.objects.filter(
-                user=user,
-                parent_gallery__isnull=True
+
+        # Every gallery the user can reach in one query, each row flagged with
+        # its access bucket(s) and carrying its own cover and photo count
+        galleries = list(
+            Gallery.objects.annotate(
+                is_assigned=Exists(
+                    Gallery.assigned_clients.through.objects.filter(gallery=OuterRef('pk'), user=user)
+                ),
+                is_shared=Exists(
+                    Gallery.accessible_users.through.objects.filter(gallery=OuterRef('pk'), user=user)
+                ),
             )
-        
-        print("Owned galleries:", owned_galleries)
+            .filter(
+                Q(user=user, parent_gallery__isnull=True) | Q(is_assigned=True) | Q(is_shared=True)
+            )
+            .annotate(
+                photo_count=Count('photos', filter=Q(photos__deleted_at__isnull=True)),
+                cover_image_name=Subquery(
+                    Photo.objects.filter(gallery=OuterRef('pk')).order_by('order_key', 'pk').values('image')[:1]
+                ),
+            )
+            .select_related('user')
+            .order_by('id')
+        )
+
+        context = {
+            'request': request,
+            'owner_slugs': owner_slugs({gallery.user_id for gallery in galleries}),
+        }
+
+        def serialize(rows):
+            return GalleryListSerializer(rows, many=True, context=context).data
 
-        # Assigned galleries
-        assigned_galleries = Gallery.objects.filter(assigned_clients=user)
-        
-        # Shared galleries (accessible but not assigned)
-        shared_galleries = Gallery.objects.filter(accessible_users=user)
-        
         data = {
-            'owned_galleries': GalleryListSerializer(
-                owned_galleries, many=True, context={'request': request}
-            ).data,
-            'assigned_galleries': GalleryListSerializer(
-                assigned_galleries, many=True, context={'request': request}
-            ).data,
-            'shared_galleries': GalleryListSerializer(
-                shared_galleries, many=True, context={'request': request}
-            ).data,
+            'owned_galleries': serialize([
+                g for g in galleries if g.user_id == user.id and g.parent_gallery_id is None
+            ]),
+            'assigned_galleries': serialize([g for g in galleries if g.is_assigned]),
+            'shared_galleries': serialize([g for g in galleries if g.is_shared]),
         }
         
         return Response(data)
 
 
-class ClientAssignedGalleriesView(generics.ListAPIView):
+class ClientAssignedGalleriesView(SparseFieldsViewMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = GallerySerializer
     pagination_class = StandardResultsSetPagination
@@ -500,10 +621,12 @@ class ClientAssignedGalleriesView(generics.ListAPIView):
         
         if self.request.query_params.get("top_only") == "true":
             queryset = queryset.filter(parent_gallery__isnull=True)
-        return queryset
+        return queryset.select_related("user").prefetch_related(
+            *gallery_prefetches(self.get_sparse_fields())
+        )
 
 
-class ClientAssignedPhotosView(generics.ListAPIView):
+class ClientAssignedPhotosView(SparseFieldsViewMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PhotoSerializer
     pagination_class = StandardResultsSetPagination
@@ -512,11 +635,18 @@ class ClientAssignedPhotosView(generics.ListAPIView):
         user = self.request.user
         return Photo.objects.filter(
             Q(assigned_clients=user) | Q(accessible_users=user)
-        ).distinct()
+        ).distinct().order_by("gallery_id", "order_key", "id").select_related("gallery").prefetch_related(
+            *photo_prefetches(self.get_sparse_fields())
+        )
 
 
-# ---- GALLERY LIST / CREATE (No changes needed) ----
-class GalleryListCreateView(generics.ListCreateAPIView):
+# ---- GALLERY LIST / CREATE ----
+class GalleryListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
+    """
+    The signed-in user's galleries. `?fields=` / `?expand=` trim the output,
+    e.g. `?fields=id,title,photo_count` for the dashboard, and only the
+    relations left in are prefetched.
+    """
     serializer_class = GalleryRecursiveSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
@@ -529,9 +659,54 @@ class GalleryListCreateView(generics.ListCreateAPIView):
         if self.request.query_params.get("top_only") == "true":
             queryset = queryset.filter(parent_gallery__isnull=True)
 
-        print("Queryset for GalleryListCreateView:", queryset)
+        return queryset.select_related("user").prefetch_related(
+            *gallery_prefetches(self.get_sparse_fields())
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        galleries = page if page is not None else list(queryset)
 
-        return queryset
+        context = self.get_serializer_context()
+        context.update(self.get_tree_context(galleries))
+        serializer = self.get_serializer(galleries, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def get_tree_context(self, galleries):
+        """
+        Resolve slugs, photo totals and the sub-gallery tree of the listed
+        galleries once, not per gallery, looking only at their subtrees.
+        """
+        context = {}
+        user = self.request.user
+        sparse = self.get_sparse_fields()
+        if wants(sparse, "slug"):
+            context["owner_slugs"] = owner_slugs([user.id])
+
+        want_totals = wants(sparse, "photo_count")
+        want_children = wants(sparse, "sub_galleries", expandable=True)
+        if not galleries or not (want_totals or want_children):
+            return context
+
+        page_ids = [gallery.id for gallery in galleries]
+        subtree_ids = galleries_subtree_ids(user.id, page_ids)
+        if want_totals:
+            context["gallery_photo_totals"] = photo_totals_by_gallery([user.id], gallery_ids=subtree_ids)
+        if want_children:
+            children = {}
+            sub_galleries = (
+                Gallery.objects.filter(id__in=subtree_ids, parent_gallery__isnull=False)
+                .select_related("user")
+                .prefetch_related(*gallery_prefetches(sparse))
+                .order_by("id")
+            )
+            for gallery in sub_galleries:
+                children.setdefault(gallery.parent_gallery_id, []).append(gallery)
+            context["gallery_children"] = children
+        return context
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -547,7 +722,7 @@ class GalleryListCreateView(generics.ListCreateAPIView):
 
 
 # ---- PHOTO LIST / CREATE (No changes needed) ----
-class PhotoListCreateView(generics.ListCreateAPIView):
+class PhotoListCreateView(SparseFieldsViewMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
@@ -563,7 +738,9 @@ class PhotoListCreateView(generics.ListCreateAPIView):
             gallery = get_object_or_404(Gallery, id=gallery_id)
             if not gallery.can_user_access(self.request.user):
                 return Photo.objects.none()
-            return gallery.photos.all()
+            return gallery.photos.prefetch_related(
+                *photo_prefetches(self.get_sparse_fields())
+            )
         return Photo.objects.none()
 
     def perform_create(self, serializer):
@@ -625,7 +802,7 @@ class PhotoListCreateView(generics.ListCreateAPIView):
 
 
 # ---- UPDATE / DELETE (No changes needed) ----
-class GalleryUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+class GalleryUpdateDeleteView(SparseFieldsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Gallery.objects.all()
     serializer_class = GallerySerializer
     permission_classes = [IsOwnerOrReadOnly]
@@ -644,9 +821,11 @@ class GalleryUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
         serializer.save()
 
     def perform_destroy(self, instance):
+        """Move the gallery and everything in it to the trash; purge_trash deletes it later."""
         if instance.user != self.request.user:
             raise PermissionDenied("You cannot delete this gallery.")
-        instance.delete()
+        trash_gallery(instance)
+        update_user_stats(instance.user)
 
 
 class PhotoUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
@@ -672,9 +851,177 @@ class PhotoUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
         serializer.save()
 
     def perform_destroy(self, instance):
+        """Move the photo to the trash; purge_trash deletes it later."""
         if instance.gallery.user != self.request.user:
             raise PermissionDenied("You cannot delete this photo.")
-        instance.delete()
+        Photo.objects.filter(pk=instance.pk).update(deleted_at=timezone.now())
+        update_user_stats(self.request.user)
+
+
+# ---- TRASH ----
+class TrashView(APIView):
+    """
+    The user's trash: galleries and photos deleted on their own. Contents
+    trashed along with a gallery come back when that gallery is restored.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        galleries = (
+            Gallery.all_objects.filter(user=request.user, deleted_at__isnull=False)
+            .exclude(parent_gallery__deleted_at=F('deleted_at'))
+            .order_by('-deleted_at')
+        )
+        photos = (
+            Photo.all_objects.filter(gallery__user=request.user, deleted_at__isnull=False)
+            .exclude(gallery__deleted_at=F('deleted_at'))
+            .order_by('-deleted_at')
+        )
+        return Response({
+            "retention_days": settings.TRASH_RETENTION_DAYS,
+            "galleries": TrashedGallerySerializer(galleries, many=True).data,
+            "photos": TrashedPhotoSerializer(photos, many=True).data
+        })
+
+
+class TrashRestoreView(APIView):
+    """Restore trashed galleries and photos: {"galleries": [...], "photos": [...]}."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = TrashRestoreSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        restored = serializer.save()
+
+        return Response({
+            "detail": "Restored from trash.",
+            "restored": restored
+        })
+
+
+# ---- IMAGE SERVING ----
+def read_range(f, start, length, chunk_size=64 * 1024):
+    """Yield `length` bytes of `f` from `start`, closing it when done."""
+    try:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def media_response(request, name, size, content_type, etag):
+    """
+    Response sending the stored file `name` once access has been checked.
+
+    With MEDIA_ACCEL_HEADER set the front proxy sends the file and the worker
+    is released at once. Otherwise it is streamed from storage, honouring a
+    single-range Range header so partial and resumed downloads work.
+    """
+    header = settings.MEDIA_ACCEL_HEADER
+    if header:
+        response = HttpResponse(content_type=content_type)
+        if header.lower() == 'x-accel-redirect':
+            response[header] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+        else:
+            response[header] = default_storage.path(name)
+        return response
+
+    size = size or default_storage.size(name)
+    byte_range = None
+    # A stale If-Range means the client's partial copy is outdated: send it all
+    if request.META.get('HTTP_IF_RANGE', etag) == etag:
+        try:
+            byte_range = parse_byte_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(default_storage.open(name, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(default_storage.open(name, 'rb'), start, end - start + 1),
+            status=206, content_type=content_type,
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+class PhotoImageView(APIView):
+    """
+    Serve a photo's image after an access check, swapping in an AVIF/WebP
+    rendition when the Accept header lists one. Anonymous viewers of a
+    shared photo or gallery pass its share token as `?token=`.
+    """
+    permission_classes = [AllowAny]
+
+    # Browsers cache the bytes for a day and revalidate with the ETag after
+    max_age = 60 * 60 * 24
+
+    def perform_content_negotiation(self, request, force=False):
+        # Accept picks an image format here, not a DRF renderer
+        return super().perform_content_negotiation(request, force=True)
+
+    def has_access(self, request, photo):
+        """
+        Signed-in access rules, or the share token of the photo, its gallery
+        or any gallery above it, since a shared gallery shares its sub-galleries.
+        """
+        token = request.query_params.get('token')
+        if token:
+            shared, seen = photo, set()
+            while shared is not None:
+                if (
+                    shared.is_shareable_via_link and shared.share_token
+                    and constant_time_compare(shared.share_token, token)
+                ):
+                    return True
+                if isinstance(shared, Photo):
+                    shared = photo.gallery
+                elif shared.parent_gallery_id and shared.parent_gallery_id not in seen:
+                    seen.add(shared.id)
+                    shared = Gallery.objects.filter(pk=shared.parent_gallery_id).only(
+                        'id', 'parent_gallery_id', 'is_shareable_via_link', 'share_token'
+                    ).first()
+                else:
+                    shared = None
+        return photo.can_user_access(request.user)
+
+    def get(self, request, pk):
+        photo = get_object_or_404(
+            Photo.objects.select_related('gallery').prefetch_related('renditions'), pk=pk
+        )
+        if not self.has_access(request, photo):
+            raise PermissionDenied("You don't have access to this photo.")
+
+        rendition = pick_rendition(photo.renditions.all(), request.META.get('HTTP_ACCEPT'))
+        if rendition:
+            name, size, content_type = rendition.file.name, rendition.file_size, rendition.content_type
+        else:
+            name, size = photo.image.name, photo.file_size
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+        etag = quote_etag(hashlib.md5(f"{name}:{size}".encode()).hexdigest())
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = media_response(request, name, size, content_type, etag)
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept'])
+        # Private photos must never be stored by shared caches
+        visibility = 'public' if photo.is_public else 'private'
+        patch_cache_control(response, max_age=self.max_age, **{visibility: True})
+        return response
 
 
 # ---- ANALYTICS VIEWS (No changes needed) ----
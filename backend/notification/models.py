@@ -1,6 +1,7 @@
 # models.py
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class NotificationSettings(models.Model):
@@ -37,3 +38,13 @@ class NotificationSettings(models.Model):
 
     def __str__(self):
         return f"Notification Settings for {self.user.username}"
+
+    def in_quiet_hours(self, moment):
+        """Whether the local wall-clock time of `moment` falls in the quiet hours."""
+        if not (self.quiet_hours and self.quiet_start and self.quiet_end):
+            return False
+        now = timezone.localtime(moment).time()
+        if self.quiet_start <= self.quiet_end:
+            return self.quiet_start <= now < self.quiet_end
+        # Quiet hours running past midnight, e.g. 22:00 to 07:00
+        return now >= self.quiet_start or now < self.quiet_end
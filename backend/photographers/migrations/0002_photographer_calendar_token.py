@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photographers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photographer',
+            name='calendar_token',
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True),
+        ),
+    ]
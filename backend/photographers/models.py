@@ -19,6 +19,9 @@ class Photographer(models.Model):
     facebook = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Secret in the URL of the bookings calendar feed; None disables the feed
+    calendar_token = models.CharField(max_length=32, unique=True, blank=True, null=True)
+
     # Many-to-many relation to users via Client
     all_clients = models.ManyToManyField(
         User,
@@ -62,17 +62,19 @@ class ClientSerializer(serializers.ModelSerializer):
 
     def get_total_spent(self, obj):
         """Return the sum of successful payments by this client."""
-        client = Client.objects.filter(user=obj.user).first()
+        if hasattr(obj, "total_spent"):
+            return obj.total_spent
         total = Payment.objects.filter(
-            booking__client=client,
+            booking__client=obj,
             payment_status=Payment.STATUS_PAID
         ).aggregate(total=Sum("amount_paid"))["total"]
         return total or 0
 
     def get_total_bookings(self, obj):
         """Return the total number of bookings for this client."""
-        client = Client.objects.filter(user=obj.user).first()
-        return Booking.objects.filter(client=client).count()
+        if hasattr(obj, "total_bookings"):
+            return obj.total_bookings
+        return Booking.objects.filter(client=obj).count()
 
 
 class ClientCreateSerializer(serializers.ModelSerializer):
@@ -9,7 +9,8 @@ from .serializers import (
     ClientCreateSerializer
 )
 from bookings.models import Booking
-from bookings.serializers import BookingSerializer
+from bookings.serializers import BookingFilterSerializer, BookingSerializer
+from bookings.utils import with_client_totals
 
 
 class ClientPagination(PageNumberPagination):
@@ -33,7 +34,10 @@ class ClientListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if hasattr(user, "photographer"):
-            return Client.objects.filter(photographer=user.photographer).distinct()
+            clients = Client.objects.filter(photographer=user.photographer).select_related(
+                "user", "photographer__user"
+            )
+            return with_client_totals(clients)
         return Client.objects.none()
 
     def perform_create(self, serializer):
@@ -52,7 +56,7 @@ class ClientDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         # Return all clients; object-level permissions are enforced in get_object
-        return Client.objects.all()
+        return with_client_totals(Client.objects.select_related("user", "photographer__user"))
 
     def get_object(self):
         obj = super().get_object()
@@ -85,7 +89,10 @@ class ClientBookingsView(generics.ListAPIView):
         client_id = self.kwargs['pk']
         user = self.request.user
         if hasattr(user, "photographer"):
-            return Booking.objects.filter(client_id=client_id, photographer=user.photographer)
+            filters = BookingFilterSerializer(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            bookings = Booking.objects.filter(client_id=client_id, photographer=user.photographer).for_list()
+            return filters.filter_queryset(bookings)
         return Booking.objects.none()
 
 
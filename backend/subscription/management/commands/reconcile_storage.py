@@ -0,0 +1,80 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from gallery.models import Photo
+from subscription.models import Stats
+from subscription.utils import storage_totals_by_user
+
+
+class Command(BaseCommand):
+    help = "Backfill missing photo sizes and correct drift in Stats.storage_used."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        backfilled = self.backfill_file_sizes(batch_size, dry_run)
+        self.stdout.write(f"Backfilled sizes for {backfilled} photos.")
+
+        totals = storage_totals_by_user()
+
+        # Correct existing rows that drifted
+        to_update = []
+        seen = set()
+        for stats in Stats.objects.only("id", "user_id", "storage_used").iterator(chunk_size=batch_size):
+            seen.add(stats.user_id)
+            expected = totals.get(stats.user_id, 0)
+            if stats.storage_used != expected:
+                stats.storage_used = expected
+                to_update.append(stats)
+
+        # Users with photos but no Stats row yet
+        to_create = [
+            Stats(user_id=user_id, storage_used=total)
+            for user_id, total in totals.items()
+            if user_id not in seen
+        ]
+
+        if not dry_run:
+            Stats.objects.bulk_update(to_update, ["storage_used"], batch_size=batch_size)
+            Stats.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reconciliation complete. Corrected {len(to_update)} and created "
+                f"{len(to_create)} stats rows{' (dry run)' if dry_run else ''}."
+            )
+        )
+
+    def backfill_file_sizes(self, batch_size, dry_run):
+        """Stat each legacy photo once and store its size in batched UPDATEs."""
+        count = 0
+        last_id = 0
+        photos = Photo.all_objects.filter(file_size=0).exclude(image="").only("id", "image").order_by("id")
+
+        # Page by id rather than a server-side cursor: rows are updated as we go
+        while True:
+            batch = list(photos.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            sized = []
+            for photo in batch:
+                try:
+                    photo.file_size = default_storage.size(photo.image.name)
+                except OSError:
+                    continue
+                sized.append(photo)
+
+            if sized and not dry_run:
+                Photo.all_objects.bulk_update(sized, ["file_size"])
+            count += len(sized)
+
+        return count
@@ -1,10 +1,17 @@
-from django.db.models import Sum
-from gallery.models import Gallery, Photo
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from gallery.models import Gallery, Photo, PhotoRendition
 from bookings.models import Booking
 from photographers.models import Client
 from .models import Stats
 
 def update_user_stats(user):
+    """
+    Refresh the counters on a user's Stats row.
+
+    `storage_used` is not recomputed here: it is maintained incrementally by
+    `adjust_storage_used` and corrected in bulk by `reconcile_storage`.
+    """
     stats, _ = Stats.objects.get_or_create(user=user)
 
     galleries = Gallery.objects.filter(user=user)
@@ -12,19 +19,74 @@ def update_user_stats(user):
 
     galleries_count = galleries.count()
     photos_count = photos.count()
-    # loop over photos and sum their file sizes
-    storage_used = sum(p.image.size for p in photos if p.image and hasattr(p.image, "size"))
 
     clients_count = Client.objects.filter(photographer__user=user).count()
     bookings_count = user.bookings.count() if hasattr(user, "bookings") else 0
 
     stats.galleries_count = galleries_count
     stats.photos_count = photos_count
-    stats.storage_used = storage_used
     stats.clients_count = clients_count
     stats.bookings_count = bookings_count
 
-    stats.save()
+    stats.save(update_fields=[
+        "galleries_count", "photos_count", "clients_count", "bookings_count", "updated_at"
+    ])
 
     return stats
 
+
+def _apply_storage_delta(queryset, delta):
+    """Run a single UPDATE adding `delta` bytes, never going below zero."""
+    return queryset.update(storage_used=Greatest(F("storage_used") + delta, 0))
+
+
+def adjust_storage_used(user_id, delta):
+    """Atomically add `delta` bytes (may be negative) to a user's storage_used."""
+    if not user_id or not delta:
+        return
+    if not _apply_storage_delta(Stats.objects.filter(user_id=user_id), delta):
+        Stats.objects.get_or_create(user_id=user_id)
+        _apply_storage_delta(Stats.objects.filter(user_id=user_id), delta)
+
+
+def adjust_gallery_owner_storage_used(gallery_id, delta):
+    """Same as `adjust_storage_used`, resolving the owner through the gallery in SQL."""
+    if not gallery_id or not delta:
+        return
+    _apply_storage_delta(Stats.objects.filter(user__galleries=gallery_id), delta)
+
+
+def adjust_photo_owner_storage_used(photo_id, delta):
+    """Same as `adjust_storage_used`, resolving the owner through the photo in SQL."""
+    if not photo_id or not delta:
+        return
+    _apply_storage_delta(Stats.objects.filter(user__galleries__photos=photo_id), delta)
+
+
+def transfer_storage_used(from_user_id, to_user_id, size):
+    """Move `size` bytes from one user's storage_used to another's."""
+    if from_user_id == to_user_id:
+        return
+    adjust_storage_used(from_user_id, -size)
+    adjust_storage_used(to_user_id, size)
+
+
+def storage_totals_by_user():
+    """Return {user_id: bytes} summed from stored photo and rendition sizes."""
+    totals = {}
+    # Photos in the trash still occupy storage until they are purged
+    photo_rows = (
+        Photo.all_objects.filter(gallery__user__isnull=False)
+        .values_list("gallery__user")
+        .annotate(total=Sum("file_size"))
+        .order_by()
+    )
+    rendition_rows = (
+        PhotoRendition.objects.filter(photo__gallery__user__isnull=False)
+        .values_list("photo__gallery__user")
+        .annotate(total=Sum("file_size"))
+        .order_by()
+    )
+    for user_id, total in [*photo_rows, *rendition_rows]:
+        totals[user_id] = totals.get(user_id, 0) + (total or 0)
+    return totals